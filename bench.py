@@ -0,0 +1,363 @@
+"""
+Offline benchmark of the render pipeline.
+
+Generates its own inputs (ffmpeg testsrc2 background clips, a sine tone and quotes of
+different lengths), times RenderQuoteAsImage.convert_quote_to_image,
+RenderImageAsVideo.convert_image and process_video_with_overlay (per stage, from the perf
+spans) and writes the results as JSON, optionally compared with an earlier run's results.
+Timings only compare between runs on the same machine, so no baseline is kept in the repo.
+
+    python bench.py                       # full suite
+    python bench.py --quick --engines stream ffmpeg
+    python bench.py --baseline output/bench/20250101-120000.json
+
+Every case runs in a fresh interpreter, so its peak memory is its own.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess as sp
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from rich import print
+from rich.table import Table
+from rich.console import Console
+
+from consts import CACHE_PATH
+
+BENCH_ASSETS_PATH = os.path.join(CACHE_PATH, "bench")
+BENCH_RESULTS_PATH = os.path.join(os.path.split(__file__)[0], "output", "bench")
+
+# (width, height, seconds) of the generated background clips
+CLIPS = [(640, 360, 3), (1280, 720, 3), (1920, 1080, 3), (1280, 720, 10)]
+QUICK_CLIPS = [(640, 360, 3)]
+ENGINES = ["frames", "spool", "stream", "ffmpeg"]
+AUDIO_SECONDS = 60
+AUDIO_SECTION = (5, 25)
+QUOTES = {
+    "short": "Be yourself.",
+    "medium": "The only way to do great work is to love what you do. If you haven't found it yet, keep looking.",
+    "long": " ".join(
+        [
+            "Success is not final, failure is not fatal: it is the courage to continue that counts.",
+            "We make a living by what we get, but we make a life by what we give.",
+            "Do not let what you cannot do interfere with what you can do,",
+            "and never confuse a single defeat with a final defeat.",
+        ]
+    ),
+}
+IMAGE_RUNS = 10
+
+
+def _run_ffmpeg(*args: str):
+    sp.run(["ffmpeg", "-v", "error", "-nostdin", *args, "-y"], check=True)
+
+
+def default_font() -> str:
+    """
+    DejaVu Sans from matplotlib's data directory: present wherever the project's dependencies
+    are installed, so every machine benchmarks the same font.
+    """
+    import matplotlib
+
+    return os.path.join(matplotlib.get_data_path(), "fonts", "ttf", "DejaVuSans.ttf")
+
+
+def clip_name(width: int, height: int, seconds: int) -> str:
+    return f"testsrc_{width}x{height}_{seconds}s.mp4"
+
+
+def generate_assets(assets_dir: str, clips: list[tuple]) -> dict:
+    """
+    Creates (once) the synthetic background clips and the sine tone, and returns their paths.
+    """
+    os.makedirs(assets_dir, exist_ok=True)
+    assets = {"clips": {}, "audio": os.path.join(assets_dir, "sine.m4a")}
+    if not os.path.exists(assets["audio"]):
+        _run_ffmpeg(
+            "-f", "lavfi", "-i", f"sine=frequency=220:duration={AUDIO_SECONDS}",
+            "-c:a", "aac", "-b:a", "192k", assets["audio"]
+        )
+
+    for width, height, seconds in clips:
+        path = os.path.join(assets_dir, clip_name(width, height, seconds))
+        if not os.path.exists(path):
+            _run_ffmpeg(
+                "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=30:duration={seconds}",
+                "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+                "-c:v", "libx264", "-preset", "fast", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path
+            )
+        assets["clips"][clip_name(width, height, seconds)] = path
+    return assets
+
+
+def _stages(report: dict) -> dict:
+    """
+    Sums the report's spans by name.
+    """
+    stages = {}
+    for span in report["spans"]:
+        stage = stages.setdefault(span["name"], {"wall_s": 0.0, "cpu_s": 0.0, "frames": 0})
+        stage["wall_s"] += span["wall_s"]
+        stage["cpu_s"] += span["cpu_s"]
+        stage["frames"] += span["frames"] or 0
+    for stage in stages.values():
+        stage["fps"] = round(stage["frames"] / stage["wall_s"], 3) if stage["frames"] and stage["wall_s"] else None
+        stage["wall_s"] = round(stage["wall_s"], 6)
+        stage["cpu_s"] = round(stage["cpu_s"], 6)
+    return stages
+
+
+def _quote_renderer(font: str, work_dir: str, overlay: bool = False):
+    from render import RenderQuoteAsImage
+
+    renderer = RenderQuoteAsImage(font_file=font, output_dir=os.path.join(work_dir, "images"))
+    if overlay:
+        renderer.mode = "RGBA"
+        renderer.bg_color = (0, 0, 0, 0)
+    return renderer
+
+
+def run_case(case: dict, work_dir: str) -> dict:
+    """
+    Runs one benchmark case in this process and returns its metrics.
+    """
+    import perf
+
+    result = {"name": case["name"], "kind": case["kind"], "params": case}
+    if case["kind"] == "image":
+        from render import get_text_layer_cache
+
+        renderer = _quote_renderer(case["font"], work_dir, overlay=case["overlay"])
+        renderer.convert_quote_to_image(QUOTES[case["quote"]]) # warm up
+        perf.reset()
+        timings = []
+        for _ in range(IMAGE_RUNS):
+            renderer.output_name = uuid.uuid4().hex + ".png"
+            get_text_layer_cache().clear() # time the whole render, layout and rasterization included
+            start = time.perf_counter()
+            renderer.convert_quote_to_image(QUOTES[case["quote"]])
+            timings.append(time.perf_counter() - start)
+        result["ms_per_image"] = round(statistics.median(timings) * 1000, 3)
+        result["images_per_s"] = round(1 / statistics.median(timings), 3)
+
+    elif case["kind"] == "still":
+        from video import RenderImageAsVideo
+
+        image_path = _quote_renderer(case["font"], work_dir).convert_quote_to_image(QUOTES["medium"])
+        iv = RenderImageAsVideo(
+            output_path=os.path.join(work_dir, "videos"),
+            fast_path=case["fast_path"],
+            render_cache=False
+        )
+        perf.reset()
+        iv.set_audio_section(case["audio"], AUDIO_SECTION)
+        start = time.perf_counter()
+        iv.convert_image(image_path, "still.mp4")
+        result["fps"] = round(iv.duration * 30 / (time.perf_counter() - start), 3)
+
+    else:
+        from video import process_video_with_overlay
+
+        overlay_path = _quote_renderer(case["font"], work_dir, overlay=True).convert_quote_to_image(QUOTES["medium"])
+        perf.reset()
+        process_video_with_overlay(
+            case["clip"],
+            overlay_path,
+            os.path.join(work_dir, "overlay.mp4"),
+            temp_dir_base=os.path.join(work_dir, "temp_video_processing"),
+            audio_source_path=case["audio"],
+            audio_section=AUDIO_SECTION,
+            engine=case["engine"],
+            backend=case["backend"],
+            workers=case["workers"],
+            compositor=case["compositor"],
+            render_cache=False
+        )
+        report = perf.report()
+        overlay_span = next(span for span in report["spans"] if span["name"] == "overlay_video")
+        frames = max(span["frames"] or 0 for span in report["spans"])
+        result["fps"] = round(frames / overlay_span["wall_s"], 3) if frames else None
+
+    report = perf.report()
+    result["wall_s"] = report["total"]["wall_s"]
+    result["cpu_s"] = report["total"]["cpu_s"]
+    result["peak_rss_bytes"] = report["total"]["peak_rss_bytes"]
+    result["child_peak_rss_bytes"] = report["total"]["child_peak_rss_bytes"]
+    result["stages"] = _stages(report)
+    return result
+
+
+def run_case_isolated(case: dict, work_dir: str) -> dict:
+    """
+    Runs a case in a fresh interpreter (so peak RSS is per case) and reads back its result.
+    """
+    case_dir = tempfile.mkdtemp(dir=work_dir)
+    result_path = os.path.join(case_dir, "result.json")
+    try:
+        sp.run(
+            [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case), "--result", result_path],
+            check=True, cwd=case_dir, stdout=sp.DEVNULL
+        )
+        with open(result_path, encoding="utf-8") as file:
+            return json.load(file)
+    finally:
+        shutil.rmtree(case_dir, ignore_errors=True)
+
+
+def build_cases(assets: dict, font: str, engines: list[str], backend: str, workers: int, compositor: str) -> list[dict]:
+    cases = []
+    for quote in QUOTES:
+        for overlay in (False, True):
+            name = f"image/{quote}/{'rgba' if overlay else 'rgb'}"
+            cases.append({"name": name, "kind": "image", "quote": quote, "overlay": overlay, "font": font})
+    for fast_path in (True, False):
+        cases.append({
+            "name": f"still/{'ffmpeg' if fast_path else 'moviepy'}", "kind": "still",
+            "fast_path": fast_path, "font": font, "audio": assets["audio"]
+        })
+    for name, clip in assets["clips"].items():
+        for engine in engines:
+            if compositor == "numpy" and engine not in ("spool", "stream"):
+                continue
+            cases.append({
+                "name": f"overlay/{os.path.splitext(name)[0]}/{engine}", "kind": "overlay", "clip": clip,
+                "engine": engine, "backend": backend, "workers": workers, "compositor": compositor,
+                "font": font, "audio": assets["audio"]
+            })
+    return cases
+
+
+def _primary_metric(result: dict) -> tuple[str, bool]:
+    """
+    The metric a case is judged on, and whether higher is better.
+    """
+    if "ms_per_image" in result:
+        return "ms_per_image", False
+    return "fps", True
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[dict]:
+    """
+    Compares every case with the same case in the baseline; a change past `threshold` percent
+    in the wrong direction is a regression.
+    """
+    baseline_cases = {case["name"]: case for case in baseline.get("cases", [])}
+    rows = []
+    for result in results:
+        metric, higher_is_better = _primary_metric(result)
+        before = baseline_cases.get(result["name"], {}).get(metric)
+        after = result.get(metric)
+        row = {"name": result["name"], "metric": metric, "baseline": before, "current": after, "change_pct": None}
+        if before and after:
+            change = (after - before) / before * 100
+            row["change_pct"] = round(change, 2)
+            worse = -change if higher_is_better else change
+            row["status"] = "regression" if worse > threshold else ("improvement" if -worse > threshold else "same")
+        else:
+            row["status"] = "new"
+        rows.append(row)
+    return rows
+
+
+def print_comparison(rows: list[dict]):
+    table = Table(title="Benchmark")
+    for column in ("case", "metric", "baseline", "current", "change", "status"):
+        table.add_column(column)
+    colors = {"regression": "red", "improvement": "green", "same": "white", "new": "cyan"}
+    for row in rows:
+        change = f"{row['change_pct']:+.1f}%" if row["change_pct"] is not None else "-"
+        table.add_row(
+            row["name"], row["metric"], str(row["baseline"] or "-"), str(row["current"] or "-"), change,
+            f"[{colors[row['status']]}]{row['status']}[/{colors[row['status']]}]"
+        )
+    Console().print(table)
+
+
+def _git_commit() -> str | None:
+    try:
+        return sp.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.split(os.path.abspath(__file__))[0]
+        ).stdout.strip()
+    except (sp.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the quote render pipeline.")
+    parser.add_argument("--quick", action="store_true", help="only the smallest background clip")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--backend", choices=["thread", "process"], default="thread")
+    parser.add_argument("--compositor", choices=["pil", "numpy"], default="pil")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--font", default=None, help="font file to render with (default: DejaVu Sans)")
+    parser.add_argument("--only", default=None, help="only run cases whose name contains this")
+    parser.add_argument("--assets", default=BENCH_ASSETS_PATH, help="where the generated inputs are kept")
+    parser.add_argument("--output", default=None, help="results JSON path")
+    parser.add_argument("--baseline", default=None, help="results JSON of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on a regression")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        result = run_case(json.loads(args.run_case), os.getcwd())
+        with open(args.result, "w", encoding="utf-8") as file:
+            json.dump(result, file)
+        return
+
+    import perf
+
+    font = args.font or default_font()
+    assets = generate_assets(args.assets, QUICK_CLIPS if args.quick else CLIPS)
+    cases = build_cases(assets, font, args.engines, args.backend, args.workers, args.compositor)
+    if args.only:
+        cases = [case for case in cases if args.only in case["name"]]
+
+    work_dir = tempfile.mkdtemp(prefix="bench-")
+    results = []
+    try:
+        for i, case in enumerate(cases, 1):
+            print(f"[{i}/{len(cases)}] [bold]{case['name']}[/bold]...")
+            results.append(run_case_isolated(case, work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    host = perf.report()
+    data = {
+        "created_at": datetime.now().isoformat(),
+        "commit": _git_commit(),
+        "host": host["host"],
+        "platform": host["platform"],
+        "python": host["python"],
+        "cpu_count": host["cpu_count"],
+        "cases": results,
+    }
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+    rows = compare(results, baseline, args.threshold)
+    data["comparison"] = {"baseline": args.baseline, "threshold_pct": args.threshold, "cases": rows}
+    print_comparison(rows)
+
+    output = args.output or os.path.join(BENCH_RESULTS_PATH, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=4)
+    print("Results:", output)
+
+    if args.fail_on_regression and any(row["status"] == "regression" for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+from consts import CACHE_PATH
+
+# Content hashes keyed by (path, size, mtime), so unchanged files are only read once per process.
+_digests: dict[tuple[str, int, int], str] = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    """
+    Returns the sha256 of a file's content.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        if memo_key in _digests:
+            return _digests[memo_key]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(1 << 20):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _digests_lock:
+        _digests[memo_key] = digest
+    return digest
+
+
+def make_key(*parts) -> str:
+    """
+    Builds a cache key from JSON serialisable parts (file digests, sizes, settings...).
+    """
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class ArtifactCache:
+    """
+    A directory of files addressed by key, evicted least recently used first
+    once it grows past `max_bytes`.
+    """
+
+    def __init__(self, name: str, **kwargs):
+        self.root = kwargs.get("root") or CACHE_PATH
+        self.max_bytes = kwargs.get("max_bytes")
+        self.path = os.path.join(self.root, name)
+        os.makedirs(self.path, exist_ok=True)
+
+    def path_for(self, key: str, suffix: str) -> str:
+        return os.path.join(self.path, key + suffix)
+
+    def temp_path(self, suffix: str) -> str:
+        """
+        A unique path inside the cache directory to build an artifact in before `put`.
+        """
+        return os.path.join(self.path, f".tmp-{uuid.uuid4().hex}{suffix}")
+
+    def get(self, key: str, suffix: str) -> str | None:
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, suffix: str, src_path: str) -> str:
+        """
+        Moves a finished artifact into the cache (atomically) and evicts old entries if needed.
+        """
+        path = self.path_for(key, suffix)
+        os.replace(src_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: str = None):
+        if not self.max_bytes:
+            return
+
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.is_file() and not entry.name.startswith(".tmp-"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -2,6 +2,8 @@ import os
 
 FINAL_VIDEO_PATH = os.path.join(os.path.split(__file__)[0], "output", "videos")
 FINAL_IMAGE_PATH = os.path.join(os.path.split(__file__)[0], "output", "images")
+CACHE_PATH = os.path.join(os.path.split(__file__)[0], "cache")
+REPORTS_PATH = os.path.join(os.path.split(__file__)[0], "output", "reports")
 BASE_URL = "https://zenquotes.io"
 END_POINTS = {
     "daily": "/api/today",
@@ -0,0 +1,233 @@
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+
+from PIL import ImageFont
+
+from consts import CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+# Bumped whenever the layout of the index file changes.
+_INDEX_VERSION = 2
+# Most FreeType fonts (one per path, size and variation) kept loaded by `load_font`.
+_FONT_CACHE_SIZE = 64
+
+
+def font_directories() -> list[str]:
+    """
+    The system and user font directories of this platform (the ones matplotlib searches).
+    """
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        return [
+            os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"),
+            os.path.join(os.environ.get("LOCALAPPDATA", os.path.join(home, "AppData", "Local")),
+                         "Microsoft", "Windows", "Fonts"),
+        ]
+    if sys.platform == "darwin":
+        return [
+            "/Library/Fonts/",
+            "/Network/Library/Fonts/",
+            "/System/Library/Fonts/",
+            "/opt/local/share/fonts",
+            os.path.join(home, "Library", "Fonts"),
+        ]
+
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(home, ".local", "share")
+    return [
+        "/usr/X11R6/lib/X11/fonts/TTF/",
+        "/usr/X11/lib/X11/fonts",
+        "/usr/share/fonts/",
+        "/usr/local/share/fonts/",
+        "/usr/lib/openoffice/share/fonts/truetype/",
+        os.path.join(data_home, "fonts"),
+        os.path.join(home, ".fonts"),
+    ]
+
+
+class FontIndex:
+    """
+    An on-disk index of the installed fonts (file name, family and style -> path), so finding a
+    font doesn't walk every font directory. It is rebuilt when the mtime of any indexed directory
+    changes, which happens whenever a font file is added, removed or renamed in it.
+
+    Building only lists the font files. A font's family and style are read the first time a
+    lookup filters by them, and saved with the index, so keyword lookups never open a font file.
+    """
+
+    def __init__(self, **kwargs):
+        self.path = kwargs.get("path") or os.path.join(CACHE_PATH, "fonts.json")
+        self.directories = kwargs.get("directories") or font_directories()
+        self.fonts: list[dict] = []
+        self.mtimes: dict[str, int | None] = {}
+        self.lock = threading.Lock()
+        self._ready = False
+        self._unsaved = False # Fonts described since the index was last saved
+
+    def _is_stale(self) -> bool:
+        for directory, mtime in self.mtimes.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                if mtime is not None:
+                    return True
+        return False
+
+    def load(self) -> bool:
+        """
+        Reads the index file. Returns False if it is missing, from another version or
+        directory list, or out of date.
+        """
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != _INDEX_VERSION or data.get("directories") != self.directories:
+            return False
+
+        self.fonts = data["fonts"]
+        self.mtimes = data["mtimes"]
+        return not self._is_stale()
+
+    def build(self):
+        """
+        Walks the font directories and saves the index of the font files found.
+        """
+        fonts, mtimes = [], {}
+        for root in self.directories:
+            if not os.path.isdir(root):
+                mtimes[root] = None # Created later -> stale
+                continue
+            for directory, _, files in os.walk(root):
+                mtimes[directory] = os.stat(directory).st_mtime_ns
+                for file in files:
+                    if os.path.splitext(file)[1].lower() in FONT_EXTENSIONS:
+                        fonts.append(os.path.join(directory, file))
+
+        self.fonts = [{"path": path, "name": os.path.basename(path)} for path in sorted(set(fonts))]
+        self.mtimes = mtimes
+        self.save()
+
+    def _describe(self, font: dict) -> dict:
+        """
+        Adds the family and style of an indexed font, read from the file on first use. Fonts
+        that can't be read get None for both and aren't read again until the next rebuild.
+        """
+        if "family" not in font:
+            try:
+                font["family"], font["style"] = ImageFont.truetype(font["path"], size=10).getname()
+            except Exception as e:
+                logger.warning(f"Unable to read font {font['path']}: {e.__class__.__name__}: {e}")
+                font["family"], font["style"] = None, None
+            self._unsaved = True
+        return font
+
+    def save(self):
+        self._unsaved = False
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"version": _INDEX_VERSION, "directories": self.directories, "mtimes": self.mtimes, "fonts": self.fonts},
+                file
+            )
+        os.replace(temp_path, self.path)
+
+    def ensure(self):
+        """
+        Loads the index, rebuilding it if it is out of date (checked once per process).
+        """
+        with self.lock:
+            if not self._ready:
+                if not self.load():
+                    self.build()
+                self._ready = True
+
+    def refresh(self):
+        """
+        Forces a rebuild, e.g. after installing fonts while the process runs.
+        """
+        with self.lock:
+            self.build()
+            self._ready = True
+
+    def find(self, keyword: str = None, family: str = None, style: str = None) -> str | None:
+        """
+        The path of the first indexed font whose file name contains `keyword` and whose family
+        and style match (all case-insensitive, any of them may be omitted), or None.
+        """
+        self.ensure()
+        with self.lock:
+            try:
+                for font in self.fonts:
+                    if keyword and keyword.lower() not in font["name"].lower():
+                        continue
+                    if family and (self._describe(font)["family"] or "").lower() != family.lower():
+                        continue
+                    if style and (self._describe(font)["style"] or "").lower() != style.lower():
+                        continue
+                    return font["path"]
+                return None
+            finally:
+                if self._unsaved:
+                    self.save()
+
+
+_index: FontIndex = None
+_index_lock = threading.Lock()
+
+
+def get_font_index() -> FontIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FontIndex()
+        return _index
+
+
+def find_font(keyword: str = None, family: str = None, style: str = None) -> str | None:
+    """
+    Looks a font up in the shared system font index (see `FontIndex.find`).
+    """
+    return get_font_index().find(keyword, family, style)
+
+
+@functools.lru_cache(maxsize=_FONT_CACHE_SIZE)
+def _load_font(path: str, size: int, variation: str | tuple | None) -> ImageFont.FreeTypeFont:
+    font = ImageFont.truetype(font=path, size=size)
+    if isinstance(variation, str):
+        font.set_variation_by_name(variation)
+    elif variation is not None:
+        font.set_variation_by_axes(list(variation))
+    return font
+
+
+def load_font(path: str, size: int, variation: str | tuple | list = None) -> ImageFont.FreeTypeFont:
+    """
+    Returns the font at `path` in `size`, set to a named instance (e.g. "Bold") or to axis
+    values (e.g. (700,)) of a variable font. Fonts come from a process-wide LRU cache, so a font
+    file is parsed once per size and variation; the returned object is shared and must not be
+    changed (use `font_variant` for a modified copy).
+    """
+    if isinstance(variation, list):
+        variation = tuple(variation)
+    return _load_font(os.path.abspath(path), int(size), variation)
+
+
+def font_cache_info() -> functools._CacheInfo:
+    """
+    Hits, misses, maxsize and current size of the `load_font` cache.
+    """
+    return _load_font.cache_info()
+
+
+def clear_font_cache():
+    _load_font.cache_clear()
@@ -8,6 +8,7 @@ import re
 import random
 from consts import BODY, AUDIO_DATA, TEMPLATE_IMAGES, TEMPLATE_VIDEOS, FONTS, FINAL_VIDEO_PATH, FINAL_IMAGE_PATH
 import moviepy as mp
+import perf
 
 
 def clear():
@@ -57,8 +58,9 @@ def main():
     next_section()
 
     print("Gathering quote of the day...")
-    qt_day = qt.get_quote_of_day()
-    qt.save_quotes()
+    with perf.span("quote_fetch"):
+        qt_day = qt.get_quote_of_day()
+        qt.save_quotes()
     iv.output_name = qt_day.quote[1:-2]
     print("Recieved Quote of the day:", f"[bold]{
           qt_day.quote}[/bold]", sep="\n")
@@ -140,4 +142,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        print("Performance report:", perf.write_report())
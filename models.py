@@ -19,3 +19,26 @@ class Quote(BaseModel):
         if not (v.startswith(OPEN_QUOTE) and v.endswith(CLOSE_QUOTE)):
             return OPEN_QUOTE + v + CLOSE_QUOTE
         return v
+
+
+class RenderJob(BaseModel):
+    quote: str = Field(..., description="The text to render")
+    template: str | None = Field(None, description="Template image path, a plain background if unset")
+    font_file: str | None = Field(None, description="Font file path, found by font_keyword if unset")
+    font_keyword: str | None = Field(None, description="Keyword of a system font file name")
+    font_size: int = Field(42, description="Font size (auto_fit picks its own)")
+    font_variation: str | list[float] | None = Field(
+        None, description="Named instance or axis values of a variable font"
+    )
+    auto_fit: bool = Field(False, description="Use the largest font size that fits the margins")
+    width: int = Field(1080, description="Image width")
+    height: int = Field(1920, description="Image height")
+    mode: str = Field("RGB", description="Image mode, RGBA for video overlays")
+    color: str | tuple[int, ...] = Field("black", description="Background color")
+    font_color: str | tuple[int, ...] = Field("white", description="Text color")
+    margin: int = Field(20, description="Margin in percent of the width")
+    wrap_mode: str = Field("greedy", description="'greedy' or 'balanced' line breaking")
+    output_name: str | None = Field(
+        None, description="Output file name, overwritten if it exists; if unset the image is named by its "
+                          "render key and an identical earlier render is reused"
+    )
@@ -0,0 +1,212 @@
+import functools
+import json
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from consts import REPORTS_PATH
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage; peak RSS and block I/O are left out there
+    resource = None
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS; ru_inblock/ru_oublock count 512 byte blocks.
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+_BLOCK_SIZE = 512
+
+
+def _sample() -> dict:
+    """
+    Reads the process counters a span is measured with. CPU time and block I/O include
+    finished child processes (the ffmpeg runs), peak RSS is the high-water mark so far.
+    """
+    times = os.times()
+    sample = {
+        "wall": time.perf_counter(),
+        "cpu": times.user + times.system + times.children_user + times.children_system,
+    }
+    if resource:
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        sample.update(
+            peak_rss=own.ru_maxrss * _RSS_UNIT,
+            child_peak_rss=children.ru_maxrss * _RSS_UNIT,
+            read=(own.ru_inblock + children.ru_inblock) * _BLOCK_SIZE,
+            written=(own.ru_oublock + children.ru_oublock) * _BLOCK_SIZE,
+        )
+    return sample
+
+
+class Span:
+    """
+    One timed stage of a run. `frames` can be set (or added to with `add_frames`) while
+    the span is open to get its frames per second in the report.
+    """
+
+    def __init__(self, name: str, parent: str = None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.frames: int = None
+        self.error: str = None
+        self.start: dict = None
+        self.end: dict = None
+
+    def to_dict(self, origin: dict) -> dict:
+        wall = self.end["wall"] - self.start["wall"]
+        data = {
+            "name": self.name,
+            "parent": self.parent,
+            "start_s": round(self.start["wall"] - origin["wall"], 6),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(self.end["cpu"] - self.start["cpu"], 6),
+            "peak_rss_bytes": self.end.get("peak_rss"),
+            "child_peak_rss_bytes": self.end.get("child_peak_rss"),
+            "read_bytes": self.end["read"] - self.start["read"] if "read" in self.end else None,
+            "written_bytes": self.end["written"] - self.start["written"] if "written" in self.end else None,
+            "frames": self.frames,
+            "fps": round(self.frames / wall, 3) if self.frames and wall > 0 else None,
+        }
+        if self.error:
+            data["error"] = self.error
+        if self.attrs:
+            data["attrs"] = self.attrs
+        return data
+
+
+class _Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.run_id = uuid.uuid4().hex
+            self.started_at = datetime.now(timezone.utc).isoformat()
+            self.origin = _sample()
+            self.spans: list[Span] = []
+
+    @property
+    def stack(self) -> list[Span]:
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+
+_recorder = _Recorder()
+
+
+@contextmanager
+def span(name: str, frames: int = None, **attrs):
+    """
+    Records the wall time, CPU time, peak RSS, bytes read/written and frames/sec of the
+    enclosed block as a span of the current run. Spans opened inside it are its children.
+    """
+    stack = _recorder.stack
+    current = Span(name, stack[-1].name if stack else None, **attrs)
+    current.frames = frames
+    stack.append(current)
+    current.start = _sample()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.end = _sample()
+        stack.pop()
+        with _recorder.lock:
+            _recorder.spans.append(current)
+
+
+def traced(name: str):
+    """
+    Decorator version of `span` for functions with several exits.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_frames(count: int):
+    """
+    Adds to the frame count of the innermost open span of this thread, if there is one.
+    """
+    stack = _recorder.stack
+    if stack and count:
+        stack[-1].frames = (stack[-1].frames or 0) + count
+
+
+def annotate(**attrs):
+    """
+    Attaches attributes (engine, settings...) to the innermost open span of this thread, if there is one.
+    """
+    stack = _recorder.stack
+    if stack:
+        stack[-1].attrs.update(attrs)
+
+
+def reset():
+    """
+    Drops the recorded spans and starts a new run.
+    """
+    _recorder.reset()
+
+
+def report() -> dict:
+    """
+    The run so far as a JSON serialisable dict: host details, run totals and the spans in start order.
+    """
+    with _recorder.lock:
+        origin = _recorder.origin
+        spans = sorted(_recorder.spans, key=lambda s: s.start["wall"])
+        data = {
+            "run_id": _recorder.run_id,
+            "started_at": _recorder.started_at,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "argv": sys.argv,
+        }
+    now = _sample()
+    data["total"] = {
+        "wall_s": round(now["wall"] - origin["wall"], 6),
+        "cpu_s": round(now["cpu"] - origin["cpu"], 6),
+        "peak_rss_bytes": now.get("peak_rss"),
+        "child_peak_rss_bytes": now.get("child_peak_rss"),
+    }
+    data["spans"] = [s.to_dict(origin) for s in spans]
+    return data
+
+
+def write_report(path: str = None) -> str:
+    """
+    Writes the run report as JSON, by default to REPORTS_PATH/<timestamp>_<run id>.json, and returns its path.
+    """
+    data = report()
+    if not path:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(REPORTS_PATH, f"{stamp}_{data['run_id'][:8]}.json")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=4)
+    os.replace(temp_path, path)
+    return path
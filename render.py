@@ -1,7 +1,257 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageOps
 import os
-from matplotlib import font_manager
+import logging
+import threading
+import itertools
+import math
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from uuid import uuid4
+import perf
+from fonts import find_font, load_font
+from models import RenderJob
+from cache import file_digest, make_key
+from weakref import WeakKeyDictionary
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Advance widths of the words (and the space) measured with each font, kept while the font is alive.
+_word_widths: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def measure_words(font: ImageFont.FreeTypeFont, words: list[str]) -> tuple[list[float], float]:
+    """
+    Returns the width of every word and of a space in `font`, measuring each distinct word once per font.
+    """
+    widths = _word_widths.get(font)
+    if widths is None:
+        widths = _word_widths[font] = {}
+    for word in words + [" "]:
+        if word not in widths:
+            widths[word] = font.getlength(word)
+    return [widths[word] for word in words], widths[" "]
+
+
+def break_greedy(widths: list[float], space: float, max_width: float) -> list[int]:
+    """
+    First-fit line breaking: returns the index of the first word of every line after the first.
+    A word wider than `max_width` gets a line of its own.
+    """
+    breaks = []
+    line_width = None
+    for i, width in enumerate(widths):
+        if line_width is not None and line_width + space + width <= max_width:
+            line_width += space + width
+        else:
+            if line_width is not None:
+                breaks.append(i)
+            line_width = width
+    return breaks
+
+
+def break_balanced(widths: list[float], space: float, max_width: float) -> list[int]:
+    """
+    Minimum raggedness line breaking: the breaks (as `break_greedy`) that minimise the sum of
+    squared leftover widths of all lines but the last, so the lines come out of similar length.
+    """
+    count = len(widths)
+    prefix = [0.0]
+    for width in widths:
+        prefix.append(prefix[-1] + width)
+
+    # cost[i]: best cost of laying out words[i:], next[i]: where its first line ends
+    cost = [0.0] * (count + 1)
+    next_break = [count] * (count + 1)
+    for i in range(count - 1, -1, -1):
+        cost[i] = float("inf")
+        for j in range(i + 1, count + 1):
+            line_width = prefix[j] - prefix[i] + space * (j - i - 1)
+            if line_width > max_width and j > i + 1:
+                break
+            line_cost = 0.0 if j == count else (max_width - line_width) ** 2
+            if line_cost + cost[j] < cost[i]:
+                cost[i] = line_cost + cost[j]
+                next_break[i] = j
+
+    breaks, i = [], next_break[0]
+    while i < count:
+        breaks.append(i)
+        i = next_break[i]
+    return breaks
+
+
+class TemplatePool:
+    """
+    Template images decoded once and scaled (cover and centre crop) to the reel size, kept in
+    memory least recently used first up to `max_bytes`. `get` hands out copies, so renders can
+    draw on them freely.
+    """
+
+    def __init__(self, **kwargs):
+        self.max_bytes = kwargs.get("max_bytes") or 512 * 1024 ** 2
+        self.images: OrderedDict[tuple, Image.Image] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str, size: tuple[int, int]) -> tuple:
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns, tuple(size)
+
+    @staticmethod
+    def _load(path: str, size: tuple[int, int]) -> Image.Image:
+        with Image.open(path) as image:
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        if image.size != tuple(size):
+            image = ImageOps.fit(image, size, Image.LANCZOS)
+        return image
+
+    @staticmethod
+    def _bytes(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, path: str, size: tuple[int, int]) -> Image.Image:
+        """
+        Returns a copy of the template at `path` scaled to `size`, decoding it only on the first use.
+        """
+        key = self._key(path, size)
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                self.images.move_to_end(key)
+                self.hits += 1
+                return image.copy()
+            self.misses += 1
+
+        image = self._load(path, size)
+        with self.lock:
+            if key not in self.images:
+                self.images[key] = image
+                self.size_bytes += self._bytes(image)
+                self._evict(keep=key)
+        return image.copy()
+
+    def preload(self, paths: list[str], size: tuple[int, int]):
+        for path in paths:
+            if os.path.exists(path):
+                self.get(path, size)
+
+    def _evict(self, keep: tuple):
+        for key in list(self.images):
+            if self.size_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.size_bytes -= self._bytes(self.images.pop(key))
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+            self.size_bytes = 0
+
+
+_template_pool = TemplatePool()
+
+
+def get_template_pool() -> TemplatePool:
+    return _template_pool
+
+
+def _rgb(color: str | tuple) -> tuple[int, int, int]:
+    # Text is drawn opaque, as drawing directly on an RGB template always did
+    if isinstance(color, str):
+        return ImageColor.getrgb(color)[:3]
+    return tuple(color)[:3]
+
+
+@dataclass
+class TextLayer:
+    """
+    A rasterized quote: the text in its color on a transparent RGBA image covering the text's
+    bounding box. `bbox` is that box relative to the point the text is drawn at (as returned by
+    multiline_textbbox), so the layer lands exactly where drawing the text directly would put it.
+    """
+    image: Image.Image
+    bbox: tuple[float, float, float, float]
+
+    @property
+    def text_size(self) -> tuple[float, float]:
+        return self.bbox[2] - self.bbox[0], self.bbox[3] - self.bbox[1]
+
+    def composite(self, image: Image.Image, position: tuple[int, int]) -> Image.Image:
+        """
+        Blends the layer onto `image` (in place) with the text drawn at `position`, and returns it.
+        """
+        box = (int(position[0]) + math.floor(self.bbox[0]), int(position[1]) + math.floor(self.bbox[1]))
+        if image.mode == "RGBA":
+            # alpha_composite takes no negative destination, text overflowing the top/left is cut from the source
+            left, top = max(0, -box[0]), max(0, -box[1])
+            image.alpha_composite(self.image, dest=(box[0] + left, box[1] + top), source=(left, top))
+        else:
+            image.paste(self.image, box, self.image)
+        return image
+
+
+class TextLayerCache:
+    """
+    Text layers by layout (quote, font, size, color, wrap width...), kept in memory least
+    recently used first up to `max_bytes`, so a quote is rasterized once however many
+    templates or backgrounds it is composited onto. Layers are shared and never drawn on.
+    """
+
+    def __init__(self, **kwargs):
+        self.max_bytes = kwargs.get("max_bytes") or 128 * 1024 ** 2
+        self.layers: OrderedDict[tuple, TextLayer] = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _bytes(layer: TextLayer) -> int:
+        return layer.image.width * layer.image.height * 4
+
+    def get(self, key: tuple) -> TextLayer | None:
+        with self.lock:
+            layer = self.layers.get(key)
+            if layer is None:
+                self.misses += 1
+                return None
+            self.layers.move_to_end(key)
+            self.hits += 1
+            return layer
+
+    def put(self, key: tuple, layer: TextLayer) -> TextLayer:
+        with self.lock:
+            if key not in self.layers:
+                self.layers[key] = layer
+                self.size_bytes += self._bytes(layer)
+                self._evict(keep=key)
+        return layer
+
+    def _evict(self, keep: tuple):
+        for key in list(self.layers):
+            if self.size_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.size_bytes -= self._bytes(self.layers.pop(key))
+
+    def clear(self):
+        with self.lock:
+            self.layers.clear()
+            self.size_bytes = 0
+
+
+_text_layer_cache = TextLayerCache()
+
+
+def get_text_layer_cache() -> TextLayerCache:
+    return _text_layer_cache
 
 
 class RenderQuoteAsImage:
@@ -13,60 +263,91 @@ class RenderQuoteAsImage:
         self.bg_color = kwargs.get("color") or "black"
         self.font_color = kwargs.get("font_color") or "white"
         self.font_keyword = kwargs.get("font_keyword") or "JetBrain"
+        self.font_file = kwargs.get("font_file") or None
         self.font_size = kwargs.get("font_size") or 42
+        self.font_variation = kwargs.get("font_variation") or None # Named instance or axis values of a variable font
         self.margin = kwargs.get("margin") or 20
-        self.font = self.get_font()
-        self.output_name = kwargs.get("output_name") or (uuid4().hex + ".png")
+        self.wrap_mode = kwargs.get("wrap_mode") or "greedy" # "greedy" or "balanced"
+        # With auto_fit the font size is the largest in [min_font_size, max_font_size] that fits the margins.
+        self.auto_fit = kwargs.get("auto_fit") or False
+        self.min_font_size = kwargs.get("min_font_size") or 16
+        self.max_font_size = kwargs.get("max_font_size") or 160
+        self._font: ImageFont.FreeTypeFont = None # Resolved on first use, see `font`
+        # Without an output name images are named by their render key, so an identical render is reused.
+        # These images are outputs, not cache entries: nothing evicts them, clear output_dir to reclaim the space.
+        self.output_name = kwargs.get("output_name") or None
         self.output_dir = kwargs.get(
             "output_dir") or os.path.join("output", "images")
         os.makedirs(self.output_dir, exist_ok=True)
 
     @property
-    def save(self):
-        path = os.path.join(self.output_dir, self.output_name)
-        prefix = ""
-        i = 0
-        while os.path.exists(path):
-            prefix = f"{i}_"
-            path = os.path.join(self.output_dir, prefix + self.output_name)
-            i += 1
-        return path
+    def font(self) -> ImageFont.FreeTypeFont:
+        if self._font is None:
+            self.get_font()
+        return self._font
+
+    @font.setter
+    def font(self, font: ImageFont.FreeTypeFont):
+        self._font = font
 
+    def render_key(self, quote: str) -> str:
+        """
+        Hash of everything that decides the rendered image: the text, the font file (by content),
+        size and variation, the template (by content), colors, size, margin and wrapping.
+        """
+        template = self.template if self.template and os.path.exists(self.template) else None
+        return make_key(
+            "quote_image", quote,
+            file_digest(self.font.path), self.font_variation,
+            ("auto", self.min_font_size, self.max_font_size) if self.auto_fit else self.font_size,
+            file_digest(template) if template else None,
+            self.width, self.height, self.mode, self.bg_color, self.font_color, self.margin, self.wrap_mode
+        )
+
+    def output_path(self, key: str) -> str:
+        return os.path.join(self.output_dir, self.output_name or key[:32] + ".png")
+
+    @perf.traced("font_discovery")
     def find_system_font(self):
-        # Search system fonts for a font containing the keyword
-        fonts = font_manager.findSystemFonts(fontpaths=None, fontext="ttf")
-        for font in fonts:
-            if self.font_keyword.lower() in os.path.basename(font).lower():
-                return font
+        # Search the system font index for a font containing the keyword
+        font = find_font(self.font_keyword)
+        if font:
+            return font
         raise FileNotFoundError(f"Font with keyword '{
                                 self.font_keyword}' not found.")
 
     def get_font(self):
-        font_path = self.find_system_font()
-        self.font = ImageFont.truetype(font=font_path, size=self.font_size)
+        font_path = self.font_file or self.find_system_font()
+        self.font = load_font(font_path, self.font_size, self.font_variation)
         return self.font
 
-    def set_font_from_file(self, font_file: str):
-        self.font = ImageFont.truetype(font=font_file, size=self.font_size)
+    def set_font_from_file(self, font_file: str, variation: str | tuple = None):
+        self.font_file = font_file
+        self.font_variation = variation
+        self.font = load_font(font_file, self.font_size, variation)
 
     def wrap_text(
-        self, text: str, font: ImageFont.FreeTypeFont, max_width: int
+        self, text: str, font: ImageFont.FreeTypeFont, max_width: int, mode: str = None
     ) -> list[str]:
+        # Words are measured once per font and lines are found by adding up their widths.
+        # Explicit line breaks are kept: every paragraph is wrapped on its own.
+        mode = mode or self.wrap_mode
+        if mode not in ("greedy", "balanced"):
+            raise ValueError(f"Unknown wrap mode '{mode}', expected 'greedy' or 'balanced'.")
+        break_lines = break_balanced if mode == "balanced" else break_greedy
+
         lines = []
-        if font.getlength(text) < max_width:
-            lines.append(text)
-        else:
-            words = text.split(" ")
-            i = 0
-            while i < len(words):
-                line = ""
-                while i < len(words) and font.getlength(line + words[i]) <= max_width:
-                    line += words[i] + " "
-                    i += 1
-                if not line:
-                    line = words[i]
-                    i += 1
-                lines.append(line)
+        for paragraph in text.split("\n"):
+            words = paragraph.split()
+            if not words:
+                lines.append(paragraph.strip())
+                continue
+            widths, space = measure_words(font, words)
+            breaks = break_lines(widths, space, max_width)
+
+            starts = [0] + breaks
+            ends = breaks + [len(words)]
+            lines.extend(" ".join(words[start:end]) for start, end in zip(starts, ends))
         return lines
 
     def get_center_pos(self, text_width, text_height) -> tuple[int, int]:
@@ -78,20 +359,107 @@ class RenderQuoteAsImage:
         text: str,
         align: str = "center",
         initital_pos: tuple[int, int] = (0, 0),
+        font: ImageFont.FreeTypeFont = None,
     ) -> tuple[int, int]:
         bbox = (draw.multiline_textbbox if "\n" in text else draw.textbbox)(
-            initital_pos, text=text, font=self.font, align=align
+            initital_pos, text=text, font=font or self.font, align=align
         )
         return bbox[2] - bbox[0], bbox[3] - bbox[1]
 
+    def fit_font(
+        self, text: str, max_width: int, max_height: int
+    ) -> tuple[ImageFont.FreeTypeFont, list[str]]:
+        """
+        Binary searches the largest font size whose wrapped lines fit in max_width x max_height
+        and returns that font (of the current font file and variation) with the lines.
+        Every probe is one wrap over cached word widths plus one bounding box, nothing is drawn.
+        """
+        path = self.font.path
+        draw = ImageDraw.Draw(Image.new("1", (1, 1)))
+        low, high = self.min_font_size, self.max_font_size
+        best = None
+        while low <= high:
+            size = (low + high) // 2
+            font = load_font(path, size, self.font_variation)
+            lines = self.wrap_text(text, font, max_width)
+            text_width, text_height = self.get_text_size(draw, "\n".join(lines), font=font)
+            if text_width <= max_width and text_height <= max_height:
+                best = font, lines
+                low = size + 1
+            else:
+                high = size - 1
+
+        if best is None: # Not even the smallest size fits, use it anyway
+            font = load_font(path, self.min_font_size, self.font_variation)
+            best = font, self.wrap_text(text, font, max_width)
+        return best
+
     def calculate_margin(self) -> int:
         return int((self.margin / 100) * self.width)
 
-    def convert_quote_to_image(self, quote: str) -> str | None:
+    def text_layer(self, quote: str) -> TextLayer:
+        """
+        The quote laid out within the margins and rasterized in the font color, taken from the
+        text layer cache when the same layout was rendered before in this process.
+        """
+        # self.margin stays a percentage, so the next call computes the same margin
+        margin = self.calculate_margin()
+        margined_width, margined_height = (
+            self.width - 2 * margin,
+            self.height - 2 * margin,
+        )
+        variation = self.font_variation
+        if isinstance(variation, list):
+            variation = tuple(variation)
+        color = _rgb(self.font_color)
+        key = (
+            quote, os.path.abspath(self.font.path), variation,
+            ("auto", self.min_font_size, self.max_font_size, margined_height) if self.auto_fit else self.font.size,
+            color, margined_width, self.wrap_mode
+        )
+        cache = get_text_layer_cache()
+        layer = cache.get(key)
+        if layer is not None:
+            return layer
+
+        with perf.span("text_layout"):
+            if self.auto_fit:
+                font, lines = self.fit_font(quote, margined_width, margined_height)
+            else:
+                font = self.font
+                lines = self.wrap_text(quote, font, margined_width)
+            text = "\n".join(lines)
+
+            left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).multiline_textbbox(
+                (0, 0), text, font=font, align="center"
+            )
+            # Drawn at a whole pixel offset, so the glyphs rasterize as they would on the final image
+            left_px, top_px = math.floor(left), math.floor(top)
+            mask = Image.new("L", (max(1, math.ceil(right) - left_px), max(1, math.ceil(bottom) - top_px)), 0)
+            ImageDraw.Draw(mask).multiline_text((-left_px, -top_px), text, font=font, fill=255, align="center")
+
+            image = Image.new("RGBA", mask.size, color + (0,))
+            image.putalpha(mask)
+        return cache.put(key, TextLayer(image, (left, top, right, bottom)))
+
+    def compose(self, quote: str, image: Image.Image) -> Image.Image:
+        """
+        Composites the quote's text layer centered onto `image` (in place) and returns it.
+        """
+        layer = self.text_layer(quote)
+        text_width, text_height = layer.text_size
+        return layer.composite(
+            image, ((image.width - text_width) // 2, (image.height - text_height) // 2)
+        )
+
+    def render_quote(self, quote: str) -> Image.Image:
+        """
+        Composites the quote onto the template (or background) and returns the image, unsaved.
+        """
         if self.template:
             if os.path.exists(self.template):
-                image = Image.open(self.template)
-                self.width, self.height = image.size
+                # Decoded once per process and scaled to the reel size, see TemplatePool
+                image = get_template_pool().get(self.template, (self.width, self.height))
             else:
                 image = Image.new(
                     self.mode, (self.width, self.height), color=self.bg_color
@@ -100,22 +468,82 @@ class RenderQuoteAsImage:
             image = Image.new(
                 self.mode, (self.width, self.height), color=self.bg_color)
 
-        draw = ImageDraw.Draw(image)
-        self.margin = self.calculate_margin()
-        margined_width, margined_height = (
-            self.width - 2 * self.margin,
-            self.height - 2 * self.margin,
-        )
-        lines = self.wrap_text(quote, self.font, margined_width)
+        return self.compose(quote, image)
 
-        text_width, text_height = self.get_text_size(draw, "\n".join(lines))
-        x, y = self.get_center_pos(text_width, text_height)
-
-        draw.multiline_text(
-            (x, y), "\n".join(lines), font=self.font, fill=self.font_color, align="center"
-        )
-        save_path = self.save
-        image.save(
-            save_path, format=save_path.split(".")[-1].lstrip(".").upper(), quality=100
-        )
+    def save_image(self, image: Image.Image, save_path: str) -> str:
+        with perf.span("image_save"):
+            # Written under a temporary name first, a half written file must never look like a cached render
+            temp_path = f"{save_path}.{uuid4().hex}.tmp"
+            image.save(
+                temp_path, format=save_path.split(".")[-1].lstrip(".").upper(), quality=100
+            )
+            os.replace(temp_path, save_path)
         return save_path
+
+    def convert_quote_to_image(self, quote: str) -> str | None:
+        save_path = self.output_path(self.render_key(quote))
+        if not self.output_name and os.path.exists(save_path):
+            return save_path # Same inputs, same image
+        return self.save_image(self.render_quote(quote), save_path)
+
+
+# --- Batch rendering ---
+
+def _job_renderer(job: RenderJob, output_dir: str = None) -> RenderQuoteAsImage:
+    return RenderQuoteAsImage(**job.model_dump(exclude_none=True), output_dir=output_dir)
+
+
+def _render_job(job: RenderJob, output_dir: str, return_images: bool) -> str | Image.Image | None:
+    try:
+        renderer = _job_renderer(job, output_dir)
+        if return_images:
+            return renderer.render_quote(job.quote)
+        return renderer.convert_quote_to_image(job.quote)
+    except Exception:
+        logger.warning(f"Unable to render {job.quote[:40]!r}", exc_info=True)
+        return None
+
+
+def _init_render_worker(jobs: list[RenderJob]):
+    """
+    Process pool initializer: loads every font and template the jobs use once, before the first job.
+    """
+    for job in jobs:
+        try:
+            renderer = _job_renderer(job)
+            if not job.auto_fit:
+                renderer.font
+            if job.template and os.path.exists(job.template):
+                get_template_pool().get(job.template, (job.width, job.height))
+        except Exception:
+            pass # Reported by the job itself
+
+
+def render_batch(
+    jobs: list[RenderJob],
+    output_dir: str = None,
+    workers: int = None,
+    return_images: bool = False
+) -> list[str | Image.Image | None]:
+    """
+    Renders many quotes in parallel on a process pool whose workers load the fonts and templates
+    up front, and returns the saved paths (or the images with `return_images`) in job order,
+    with None for a job that failed (logged with its traceback).
+    """
+    workers = min(workers or os.cpu_count() or 1, len(jobs) or 1)
+    with perf.span("render_batch", jobs=len(jobs), workers=workers):
+        if workers == 1:
+            _init_render_worker(jobs)
+            return [_render_job(job, output_dir, return_images) for job in jobs]
+
+        # Each distinct font/size/template once is enough to warm a worker.
+        warm = list({
+            (job.font_file, job.font_keyword, job.font_size, str(job.font_variation), job.auto_fit,
+             job.template, job.width, job.height): job
+            for job in jobs
+        }.values())
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker, initargs=(warm,)) as executor:
+            return list(executor.map(
+                _render_job, jobs, itertools.repeat(output_dir), itertools.repeat(return_images),
+                chunksize=max(1, len(jobs) // (workers * 4))
+            ))
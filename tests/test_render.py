@@ -0,0 +1,212 @@
+"""
+Tests of the quote layout in render.py. Run from the repository root:
+
+    python -m unittest discover tests
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import matplotlib
+from PIL import Image, ImageDraw
+
+from fonts import load_font
+from render import RenderQuoteAsImage, break_balanced, break_greedy, measure_words
+
+# Shipped with matplotlib, so the tests render with the same font everywhere (as bench.py does).
+FONT_PATH = os.path.join(matplotlib.get_data_path(), "fonts", "ttf", "DejaVuSans.ttf")
+BOLD_FONT_PATH = os.path.join(matplotlib.get_data_path(), "fonts", "ttf", "DejaVuSans-Bold.ttf")
+
+
+def wrap_text_baseline(text: str, font, max_width: int) -> list[str]:
+    """
+    The line breaking RenderQuoteAsImage.wrap_text did before word widths were cached, kept
+    as the reference the new algorithm must reproduce.
+    """
+    lines = []
+    if font.getlength(text) < max_width:
+        lines.append(text)
+    else:
+        words = text.split(" ")
+        i = 0
+        while i < len(words):
+            line = ""
+            while i < len(words) and font.getlength(line + words[i]) <= max_width:
+                line += words[i] + " "
+                i += 1
+            if not line:
+                line = words[i]
+                i += 1
+            lines.append(line)
+    return lines
+
+
+def _renderer(output_dir: str, **kwargs) -> RenderQuoteAsImage:
+    return RenderQuoteAsImage(**{"font_file": FONT_PATH, **kwargs}, output_dir=output_dir)
+
+
+class WrapTextTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.renderer = _renderer(self.temp_dir.name)
+        self.font = load_font(FONT_PATH, 42)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_greedy_matches_baseline(self):
+        rng = random.Random(0)
+        vocabulary = [
+            "a", "I", "be", "the", "love", "great", "quotes", "yourself", "everything", "W",
+            "imagination", "don't", "well,", "unbelievable!", "incomprehensibilities"
+        ]
+        for _ in range(200):
+            text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 40)))
+            max_width = rng.randint(80, 900)
+            expected = [line.rstrip(" ") for line in wrap_text_baseline(text, self.font, max_width)]
+            self.assertEqual(self.renderer.wrap_text(text, self.font, max_width, mode="greedy"), expected, text)
+
+    def test_keeps_explicit_line_breaks(self):
+        text = "The first line\nand the second one\n\nafter a blank line"
+        self.assertEqual(
+            self.renderer.wrap_text(text, self.font, 10_000),
+            ["The first line", "and the second one", "", "after a blank line"]
+        )
+
+    def test_wraps_each_paragraph(self):
+        text = "one two three four five six\nseven"
+        max_width = self.font.getlength("one two three")
+        self.assertEqual(
+            self.renderer.wrap_text(text, self.font, max_width),
+            ["one two three", "four five six", "seven"]
+        )
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            self.renderer.wrap_text("text", self.font, 100, mode="justified")
+
+
+class FitFontTest(unittest.TestCase):
+    QUOTE = "The only way to do great work is to love what you do. If you haven't found it yet, keep looking."
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.draw = ImageDraw.Draw(Image.new("1", (1, 1)))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _text_size(self, lines: list[str], font) -> tuple[int, int]:
+        bbox = self.draw.multiline_textbbox((0, 0), "\n".join(lines), font=font)
+        return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+    def test_fits_the_box(self):
+        for wrap_mode in ("greedy", "balanced"):
+            renderer = _renderer(self.temp_dir.name, wrap_mode=wrap_mode)
+            for max_width, max_height in [(900, 1600), (600, 300), (300, 900), (1000, 120)]:
+                font, lines = renderer.fit_font(self.QUOTE, max_width, max_height)
+                width, height = self._text_size(lines, font)
+                self.assertLessEqual(width, max_width, (wrap_mode, max_width, max_height))
+                self.assertLessEqual(height, max_height, (wrap_mode, max_width, max_height))
+                self.assertEqual(" ".join(lines).split(), self.QUOTE.split())
+
+                # It is the largest size that fits
+                if font.size < renderer.max_font_size:
+                    larger = load_font(FONT_PATH, font.size + 1)
+                    width, height = self._text_size(renderer.wrap_text(self.QUOTE, larger, max_width), larger)
+                    self.assertTrue(width > max_width or height > max_height, (wrap_mode, max_width, max_height))
+
+    def test_max_font_size(self):
+        renderer = _renderer(self.temp_dir.name, max_font_size=50)
+        font, lines = renderer.fit_font("Hi", 1000, 1000)
+        self.assertEqual(font.size, 50)
+        self.assertEqual(lines, ["Hi"])
+
+    def test_falls_back_to_min_font_size(self):
+        renderer = _renderer(self.temp_dir.name, min_font_size=20)
+        font, lines = renderer.fit_font(self.QUOTE, 40, 10)
+        self.assertEqual(font.size, 20)
+        self.assertEqual(lines, renderer.wrap_text(self.QUOTE, font, 40))
+
+
+class RenderKeyTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.template = os.path.join(self.temp_dir.name, "template.png")
+        Image.new("RGB", (1080, 1920), "navy").save(self.template)
+        self.font_file = os.path.join(self.temp_dir.name, "font.ttf")
+        shutil.copyfile(FONT_PATH, self.font_file)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _key(self, quote: str = "A quote", **kwargs) -> str:
+        kwargs = {"template": self.template, "font_file": self.font_file, **kwargs}
+        return _renderer(self.temp_dir.name, **kwargs).render_key(quote)
+
+    def test_same_inputs_same_key(self):
+        self.assertEqual(self._key(), self._key())
+
+    def test_font_by_content(self):
+        key = self._key()
+        self.assertEqual(self._key(font_file=FONT_PATH), key) # Same file under another path
+        shutil.copyfile(BOLD_FONT_PATH, self.font_file)
+        self.assertNotEqual(self._key(), key)
+
+    def test_template_by_content(self):
+        key = self._key()
+        Image.new("RGB", (1080, 1920), "maroon").save(self.template)
+        self.assertNotEqual(self._key(), key)
+
+    def test_every_setting_changes_key(self):
+        key = self._key()
+        self.assertNotEqual(self._key("Another quote"), key)
+        for setting, value in [
+            ("template", None), ("width", 720), ("height", 1280), ("mode", "RGBA"), ("color", "white"),
+            ("font_color", "red"), ("font_size", 64), ("margin", 60), ("wrap_mode", "balanced"),
+            ("auto_fit", True)
+        ]:
+            self.assertNotEqual(self._key(**{setting: value}), key, setting)
+        self.assertNotEqual(
+            self._key(auto_fit=True, max_font_size=90), self._key(auto_fit=True), "max_font_size"
+        )
+
+
+class LineBreakingTest(unittest.TestCase):
+    def test_greedy_fills_lines_first(self):
+        self.assertEqual(break_greedy([3, 2, 2, 5], 1, 6), [2, 3])
+
+    def test_balanced_evens_out_lines(self):
+        # Greedy leaves 0 and 4 units over on the first two lines, balanced 3 and 1.
+        self.assertEqual(break_balanced([3, 2, 2, 5], 1, 6), [1, 3])
+
+    def test_long_word_gets_its_own_line(self):
+        for break_lines in (break_greedy, break_balanced):
+            self.assertEqual(break_lines([2, 10, 2], 1, 5), [1, 2])
+
+    def test_single_line(self):
+        for break_lines in (break_greedy, break_balanced):
+            self.assertEqual(break_lines([2, 2, 2], 1, 100), [])
+            self.assertEqual(break_lines([], 1, 100), [])
+
+    def test_balanced_lines_fit(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            widths = [rng.uniform(5, 60) for _ in range(rng.randint(1, 30))]
+            max_width = rng.uniform(60, 200)
+            breaks = break_balanced(widths, 8, max_width)
+            for start, end in zip([0] + breaks, breaks + [len(widths)]):
+                if end - start > 1:
+                    self.assertLessEqual(sum(widths[start:end]) + 8 * (end - start - 1), max_width)
+
+    def test_measure_words(self):
+        font = load_font(FONT_PATH, 42)
+        widths, space = measure_words(font, ["quote", "of", "quote"])
+        self.assertEqual(widths, [font.getlength("quote"), font.getlength("of"), font.getlength("quote")])
+        self.assertEqual(space, font.getlength(" "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Tests of the overlay video flow in video.py. They need ffmpeg and ffprobe on the PATH and are
+skipped without them. Run from the repository root:
+
+    python -m unittest discover tests
+"""
+import os
+import re
+import shutil
+import subprocess as sp
+import tempfile
+import unittest
+
+from PIL import Image
+
+from video import _BatchCompositor, _OverlayLayer, process_video_with_overlay
+
+
+def count_frames(path: str) -> int:
+    """
+    Number of video frames in a file, counted by decoding it.
+    """
+    output = sp.run(
+        ["ffmpeg", "-i", path, "-map", "0:v:0", "-f", "null", "-"], capture_output=True, text=True, check=True
+    ).stderr
+    return int(re.findall(r"frame=\s*(\d+)", output)[-1])
+
+
+class BatchCompositorTest(unittest.TestCase):
+    def test_working_set_covers_allocations(self):
+        overlay = _OverlayLayer(Image.new("RGBA", (108, 192), (255, 255, 255, 255)))
+        for batch_size in (1, 4):
+            compositor = _BatchCompositor(overlay, batch_size)
+            allocated = sum(
+                value.nbytes for value in [*vars(compositor).values(), *compositor.premultiplied]
+                if hasattr(value, "nbytes")
+            )
+            working_set = _BatchCompositor.working_set(overlay.size, batch_size)
+            self.assertLessEqual(allocated, working_set)
+            self.assertGreater(allocated, working_set * 0.95)
+
+
+@unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+class SegmentedRenderTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.video = os.path.join(self.temp_dir.name, "input.mp4")
+        sp.run(
+            [
+                "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=320x180:rate=30:duration=4",
+                "-c:v", "libx264", "-pix_fmt", "yuv420p", self.video
+            ],
+            check=True
+        )
+        self.overlay = os.path.join(self.temp_dir.name, "overlay.png")
+        Image.new("RGBA", (108, 192), (255, 255, 255, 96)).save(self.overlay)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _render(self, name: str, **kwargs) -> str:
+        output = os.path.join(self.temp_dir.name, name)
+        process_video_with_overlay(
+            self.video, self.overlay, output, temp_dir_base=os.path.join(self.temp_dir.name, "temp"),
+            fade_in_duration=0.5, fade_out_duration=0.5, workers=2, render_cache=False, **kwargs
+        )
+        return output
+
+    def test_segments_keep_every_frame(self):
+        expected = count_frames(self._render("whole.mp4", engine="stream"))
+        self.assertEqual(expected, 120)
+        for engine in ("stream", "ffmpeg"):
+            output = self._render(f"segmented_{engine}.mp4", engine=engine, segments=3)
+            self.assertEqual(count_frames(output), expected, engine)
+
+
+if __name__ == "__main__":
+    unittest.main()
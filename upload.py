@@ -3,6 +3,7 @@ from pathlib import Path
 from PIL import Image
 import os
 import json
+import perf
 
 
 class Uploader:
@@ -36,6 +37,7 @@ class Uploader:
         self.client.load_settings(os.path.join(self.session_path, self.session_name))
         return True
 
+    @perf.traced("login")
     def login(self):
         self.client = Client()
 
@@ -76,9 +78,10 @@ class Uploader:
         if not self.caption or self.caption is None:
             self.caption = self.gather_info("Enter the video caption: \n")
 
-        result = self.client.clip_upload(
-            video_path,
-            caption=self.caption,
-            thumbnail=thumbnail_path,
-        )
+        with perf.span("upload"):
+            result = self.client.clip_upload(
+                video_path,
+                caption=self.caption,
+                thumbnail=thumbnail_path,
+            )
         return result
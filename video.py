@@ -5,26 +5,194 @@ import os
 import subprocess as sp
 import re
 from PIL import Image, ImageDraw, ImageFilter
+import numpy as np
 from rich.progress import Progress
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+import multiprocessing
+from multiprocessing import shared_memory
 import math
 import logging
+import logging.handlers
+import atexit
+import threading
 import shutil
 import time
+import json
+import hashlib
+import itertools
+import collections
+import queue
+import tempfile
+from dataclasses import dataclass
+from contextlib import contextmanager
+from cache import ArtifactCache, file_digest, make_key
+import perf
 
 # --- Configure Logger ---
 # It's generally better to configure logging outside the reusable function
 # or pass a logger instance to it, but for a self-contained module,
 # this global configuration is acceptable.
 logger = logging.getLogger(__name__)
+
+_LOG_FILE = "video_processing.log"
+# Per-frame events (records logged with extra={"sample": event}) are logged in full this many
+# times per event, then only one in _LOG_SAMPLE_EVERY, and the total is logged by summarize().
+_LOG_SAMPLE_FIRST = 5
+_LOG_SAMPLE_EVERY = 100
+_log_file: str = _LOG_FILE
+# Start method of every worker process of this module. A render runs the log listener (and the
+# queue's feeder thread), and forking a multi-threaded process can deadlock the child. The workers
+# get everything they need through their initializers.
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+_log_listener: logging.handlers.QueueListener = None
+_log_listener_pid: int = None
+# Records of the running listener; worker processes of a render send theirs here too.
+_log_queue: multiprocessing.Queue = None
+
+
+class _FrameLogSampler(logging.Filter):
+    """
+    Samples the per-frame records, so a clip with thousands of failing frames writes a handful of
+    them and a summary instead of one record per frame. It filters the file handler, which only
+    runs in the parent process, so records from worker processes are counted too.
+    """
+
+    def __init__(self, first: int = _LOG_SAMPLE_FIRST, every: int = _LOG_SAMPLE_EVERY):
+        super().__init__()
+        self.first = first
+        self.every = every
+        self.counts = collections.Counter()
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "sample", None)
+        if event is None:
+            return True
+        with self.lock:
+            self.counts[event] += 1
+            count = self.counts[event]
+        return count <= self.first or count % self.every == 0
+
+    def summarize(self):
+        """
+        Logs how often each sampled event happened since the last summary.
+        """
+        with self.lock:
+            counts = dict(self.counts)
+            self.counts.clear()
+        for event, count in counts.items():
+            logged = min(count, self.first) + count // self.every
+            logger.warning(f"'{event}' happened {count} times ({logged} logged).")
+
+
+_frame_log = _FrameLogSampler()
+
+
+def _stop_log_listener():
+    global _log_listener, _log_queue
+    # A forked child inherits the listener but not its thread, there is nothing to stop.
+    if _log_listener and _log_listener_pid == os.getpid():
+        _log_listener.stop() # Writes out whatever is still queued
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_queue.close()
+        _log_queue.join_thread()
+    _log_listener = None
+    _log_queue = None
+
+
+def configure_logging(level: int = logging.DEBUG, asynchronous: bool = False, log_file: str = None):
+    """
+    (Re)configures the module logger to append to `log_file` (video_processing.log by default).
+    Asynchronously, records are put on a queue and written by a listener thread, so frame workers
+    never wait on the file handler's lock or on disk writes, and worker processes can log to the
+    same queue. Otherwise they're written by a plain FileHandler in the calling thread.
+    """
+    global _log_file, _log_listener, _log_listener_pid, _log_queue
+    _stop_log_listener()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    _log_file = log_file or _log_file
+    logger.setLevel(level)
+    file_handler = logging.FileHandler(_log_file, "a")
+    file_handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    file_handler.addFilter(_frame_log)
+    if asynchronous:
+        _log_queue = _MP_CONTEXT.Queue()
+        logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+        _log_listener = logging.handlers.QueueListener(_log_queue, file_handler, respect_handler_level=True)
+        _log_listener.start()
+        _log_listener_pid = os.getpid()
+    else:
+        logger.addHandler(file_handler)
+
+
+def _configure_worker_logging(log_queue: multiprocessing.Queue = None):
+    """
+    Worker processes put their records on the parent's `log_queue`, where they are sampled and
+    written, or log synchronously without one.
+    """
+    global _log_listener, _log_queue
+    if not log_queue:
+        configure_logging(logger.level)
+        return
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    _log_listener = _log_queue = None
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+@contextmanager
+def _render_logging():
+    """
+    Logs through the listener thread while a render runs (unless it already does), then writes
+    the summary of the sampled frame events.
+    """
+    started = _log_listener is None
+    if started:
+        configure_logging(logger.level, asynchronous=True)
+    try:
+        yield
+    finally:
+        if started:
+            configure_logging(logger.level) # Stops the listener once the queue is written out
+        _frame_log.summarize()
+
+
 # Prevent adding multiple handlers if the module is reloaded/imported multiple times
 if not logger.handlers:
-    logger.setLevel(logging.DEBUG)
-    file_handler = logging.FileHandler("video_processing.log", "a") # Changed log file name
-    formatter = logging.Formatter("[%(levelname)s] %(message)s")
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    configure_logging()
+atexit.register(_stop_log_listener)
+
+
+# Frame rate the background video is decoded at, regardless of its source frame rate.
+_DECODE_FPS = 30
+# Box blur radius applied to the B&W background.
+_BLUR_RADIUS = 10
+# Frame rate and encoder settings of the videos rendered from still images (the moviepy
+# fallback encodes with the same codec and preset).
+_STILL_FPS = 30
+_STILL_CODEC = "libx264"
+_STILL_PRESET = "fast"
+_STILL_TUNE = "stillimage"
+# Size cap of the on-disk cache of preprocessed backgrounds.
+_BACKGROUND_CACHE_MAX_BYTES = 5 * 1024 ** 3
+# File names of the fixed-stride raw RGB24 frame spools used by engine="spool".
+_DECODED_SPOOL = "frames.rgb"
+_PROCESSED_SPOOL = "final_frames.rgb"
+# Encoder settings for every video written by the overlay flow.
+_VIDEO_CODEC_ARGS = ["-c:v", "libx264", "-crf", "23", "-preset", "medium"]
+_AUDIO_CODEC_ARGS = ["-c:a", "aac", "-b:a", "192k"]
+# Size cap of the on-disk cache of trimmed, faded and AAC encoded audio sections.
+_AUDIO_CACHE_MAX_BYTES = 512 * 1024 ** 2
+# Size cap of the on-disk cache of finished videos.
+_RENDER_CACHE_MAX_BYTES = 2 * 1024 ** 3
 
 
 # --- Helper Functions (Internal to the module) ---
@@ -39,6 +207,95 @@ def _get_video_duration(num_frames: int, fps: int) -> float:
         return 0
     return num_frames / float(fps)
 
+def _resolve_audio_path(audio_file_path: str):
+    """
+    Returns the audio path if it exists, otherwise None (with a warning) so the video
+    is created without audio.
+    """
+    if audio_file_path and not os.path.exists(audio_file_path):
+        logger.warning(f"Audio file not found at '{audio_file_path}'. Video will be created without audio.")
+        return None
+    return audio_file_path or None
+
+def _run_ffmpeg(command: list[str], what: str) -> sp.CompletedProcess:
+    """
+    Runs an ffmpeg (or ffprobe) command to completion, capturing its output. On failure the
+    command and its output are logged as "Error <what>" and the error is re-raised.
+
+    Raises:
+        subprocess.CalledProcessError: If the command fails.
+        FileNotFoundError: If the executable is not found.
+    """
+    tool = command[0]
+    logger.debug(f"Running {tool} command: {' '.join(command)}")
+    try:
+        return sp.run(command, check=True, capture_output=True, text=True)
+    except sp.CalledProcessError as e:
+        logger.error(f"Error {what}: {e.cmd}")
+        if e.stdout:
+            logger.error(f"{tool} stdout: {e.stdout}")
+        logger.error(f"{tool} stderr: {e.stderr}")
+        raise
+    except FileNotFoundError:
+        logger.error(f"Error: {tool} not found. Please ensure ffmpeg is installed and in your system's PATH.")
+        raise FileNotFoundError(f"{tool} not found. Please install ffmpeg and ensure it's in your system's PATH.")
+
+def _audio_codec_args(audio_file_path: str) -> list[str]:
+    """
+    Audio codec arguments for muxing `audio_file_path` next to an already encoded (stream copied)
+    video: AAC audio (like the cached audio sections) is stream copied, anything else is encoded to AAC.
+    """
+    command = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name",
+        "-of", "csv=p=0",
+        audio_file_path
+    ]
+    try:
+        codec = sp.run(command, check=True, capture_output=True, text=True).stdout.strip()
+    except (FileNotFoundError, sp.CalledProcessError):
+        codec = None # Let the encoder report the problem
+    return ["-c:a", "copy"] if codec == "aac" else _AUDIO_CODEC_ARGS
+
+def _build_fade_filters(fade_in_duration: float, fade_out_duration: float, total_video_duration: float) -> list[str]:
+    """
+    Builds the ffmpeg fade-in/fade-out filters for a video of the given duration.
+    """
+    video_filters = []
+    if fade_in_duration > 0:
+        video_filters.append(f"fade=t=in:st=0:d={fade_in_duration}")
+
+    if fade_out_duration > 0 and total_video_duration > fade_out_duration:
+        fade_out_start_time = max(0, total_video_duration - fade_out_duration)
+        video_filters.append(f"fade=t=out:st={fade_out_start_time}:d={fade_out_duration}")
+    elif fade_out_duration > 0: # and total_video_duration <= fade_out_duration
+        logger.warning(f"Fade-out duration ({fade_out_duration}s) is longer than or equal to total video duration ({total_video_duration:.2f}s). No fade-out applied.")
+    return video_filters
+
+def _build_encode_args(
+    vf: str,
+    fade_in_duration: float,
+    fade_out_duration: float,
+    total_video_duration: float,
+    has_audio: bool
+) -> list[str]:
+    """
+    Builds the ffmpeg output arguments shared by every encoder in this module:
+    video filters (with optional fades), the libx264 settings and the audio mapping.
+    Input 0 is expected to be the video, input 1 the audio (if any).
+    """
+    video_filters = [vf] + _build_fade_filters(fade_in_duration, fade_out_duration, total_video_duration)
+    args = ["-vf", ",".join(video_filters)]
+    args.extend(_VIDEO_CODEC_ARGS)
+
+    if has_audio:
+        # Always encoded: -shortest with a stream copied track next to a video being encoded
+        # cuts the video short.
+        args.extend(["-map", "0:v:0", "-map", "1:a:0", "-shortest"] + _AUDIO_CODEC_ARGS)
+    return args
+
+@perf.traced("encode")
 def _combine_image_dir_to_video(
     image_dir: str,
     file_name: str,
@@ -46,11 +303,13 @@ def _combine_image_dir_to_video(
     vf: str,
     fade_in_duration: float,
     fade_out_duration: float,
-    audio_file_path: str
+    audio_file_path: str,
+    spool_size: tuple = None
 ):
     """
     Combines a directory of numerically sequenced PNG images into a video file using ffmpeg,
-    with optional fade effects and audio.
+    with optional fade effects and audio. With `spool_size` (width, height) the frames are read
+    from the raw RGB24 spool file in the directory instead.
 
     Raises:
         subprocess.CalledProcessError: If the ffmpeg command fails.
@@ -58,59 +317,46 @@ def _combine_image_dir_to_video(
     """
     logger.info(f"Attempting to combine images from '{image_dir}' into '{file_name}'...")
 
-    image_files = [f for f in os.listdir(image_dir) if os.path.splitext(f)[1].lower() in [".jpg", ".png", ".jpeg"]]
-    num_frames = len(image_files)
+    if spool_size:
+        spool_path = os.path.join(os.path.abspath(image_dir), _PROCESSED_SPOOL)
+        num_frames = os.path.getsize(spool_path) // (spool_size[0] * spool_size[1] * 3)
+        command = [
+            "ffmpeg",
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{spool_size[0]}x{spool_size[1]}",
+            "-framerate", str(fps),
+            "-i", spool_path
+        ]
+    else:
+        image_files = [f for f in os.listdir(image_dir) if os.path.splitext(f)[1].lower() in [".jpg", ".png", ".jpeg"]]
+        num_frames = len(image_files)
+        command = [
+            "ffmpeg",
+            "-framerate", str(fps),
+            "-i", os.path.join(os.path.abspath(image_dir), "final_image_%09d.png")
+        ]
     total_video_duration = _get_video_duration(num_frames, fps)
+    perf.add_frames(num_frames)
 
-    command = [
-        "ffmpeg",
-        "-framerate", str(fps),
-        "-i", os.path.join(os.path.abspath(image_dir), "final_image_%09d.png")
-    ]
-
+    audio_file_path = _resolve_audio_path(audio_file_path)
     if audio_file_path:
-        if not os.path.exists(audio_file_path):
-            logger.warning(f"Audio file not found at '{audio_file_path}'. Video will be created without audio.")
-            audio_file_path = None
-        else:
-            command.extend(["-i", audio_file_path])
-
-    video_filters = [vf]
-    if fade_in_duration > 0:
-        video_filters.append(f"fade=t=in:st=0:d={fade_in_duration}")
-
-    if fade_out_duration > 0 and total_video_duration > fade_out_duration:
-        fade_out_start_time = max(0, total_video_duration - fade_out_duration)
-        video_filters.append(f"fade=t=out:st={fade_out_start_time}:d={fade_out_duration}")
-    elif fade_out_duration > 0: # and total_video_duration <= fade_out_duration
-        logger.warning(f"Fade-out duration ({fade_out_duration}s) is longer than or equal to total video duration ({total_video_duration:.2f}s). No fade-out applied.")
-
-    command.extend(["-vf", ",".join(video_filters)])
-    command.extend(["-c:v", "libx264", "-crf", "23", "-preset", "medium"])
+        command.extend(["-i", audio_file_path])
 
-    if audio_file_path:
-        command.extend(["-map", "0:v:0", "-map", "1:a:0", "-shortest", "-c:a", "aac", "-b:a", "192k"])
+    command.extend(_build_encode_args(
+        vf, fade_in_duration, fade_out_duration, total_video_duration, bool(audio_file_path)
+    ))
 
     command.append("-y")
     command.append(file_name)
 
-    logger.debug(f"Running ffmpeg command: {' '.join(command)}")
-    try:
-        sp.run(command, check=True, capture_output=True, text=True)
-        logger.info(f"Video '{file_name}' created successfully.")
-    except sp.CalledProcessError as e:
-        logger.error(f"Error creating video: {e.cmd}")
-        logger.error(f"ffmpeg stdout: {e.stdout}")
-        logger.error(f"ffmpeg stderr: {e.stderr}")
-        raise
-    except FileNotFoundError:
-        logger.error("Error: ffmpeg not found. Please ensure ffmpeg is installed and in your system's PATH.")
-        raise FileNotFoundError("ffmpeg not found. Please install ffmpeg and ensure it's in your system's PATH.")
+    _run_ffmpeg(command, "creating video")
+    logger.info(f"Video '{file_name}' created successfully.")
 
 
-def _decompress_video(vid_path: str, image_dir: str):
+def _decompress_video(vid_path: str, image_dir: str, spool: bool = False):
     """
-    Decompresses a video into a sequence of PNG image frames.
+    Decompresses a video into a sequence of PNG image frames, or with `spool` into a single
+    fixed-stride raw RGB24 spool file in `image_dir`.
 
     Raises:
         subprocess.CalledProcessError: If the ffmpeg command fails.
@@ -119,47 +365,115 @@ def _decompress_video(vid_path: str, image_dir: str):
     logger.info(f"Decompressing video '{vid_path}' into frames in '{image_dir}'...")
     os.makedirs(image_dir, exist_ok=True)
 
-    output_pattern = os.path.join(image_dir, "frame_%09d.png")
+    if spool:
+        output_args = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-y", os.path.join(image_dir, _DECODED_SPOOL)]
+    else:
+        output_args = [os.path.join(image_dir, "frame_%09d.png")]
 
     command = [
         "ffmpeg",
         "-i", vid_path,
-        "-r", "30", # Output frame rate
-        output_pattern
+        "-r", str(_DECODE_FPS), # Output frame rate
+        *output_args
     ]
 
-    logger.debug(f"Running ffmpeg command: {' '.join(command)}")
-    try:
-        sp.run(command, check=True, capture_output=True, text=True)
-        logger.info(f"Video '{vid_path}' decompressed to frames in '{image_dir}'.")
-    except sp.CalledProcessError as e:
-        logger.error(f"Error decompressing video: {e.cmd}")
-        logger.error(f"ffmpeg stdout: {e.stdout}")
-        logger.error(f"ffmpeg stderr: {e.stderr}")
-        raise
-    except FileNotFoundError:
-        logger.error("Error: ffmpeg not found. Please ensure ffmpeg is installed and in your system's PATH.")
-        raise FileNotFoundError("ffmpeg not found. Please install ffmpeg and ensure it's in your system's PATH.")
+    _run_ffmpeg(command, "decompressing video")
+    logger.info(f"Video '{vid_path}' decompressed to frames in '{image_dir}'.")
 
 
-def _smart_resize_background(bg_image: Image.Image, overlay_size: tuple):
+def _window_args(window: tuple) -> tuple[list[str], list[str]]:
     """
-    Resizes and potentially rotates the background image to intelligently fit or fill
-    the overlay's dimensions.
+    Input and filter arguments that decode only frames [first, first + count) of the
+    _DECODE_FPS timeline of a video, given as `window` = (first, count, start time of the file).
+    The input is seeked to a second before the window with the original timestamps kept, and the
+    frames are picked by their position on one fps grid, so consecutive windows join without
+    a dropped or repeated frame.
+    """
+    first, count, start_time = window
+    preroll = max(0, first - _DECODE_FPS)
+    seek_args = ["-ss", f"{preroll / _DECODE_FPS:.6f}"] if preroll else []
+    filters = [
+        f"setpts=PTS-{start_time}/TB",
+        f"fps={_DECODE_FPS}:start_time=0",
+        f"trim=start_pts={first}:end_pts={first + count}"
+    ]
+    return seek_args + ["-copyts"], filters
+
+def _probe_start_time(vid_path: str) -> float:
+    """
+    Reads the start time of a video file in seconds using ffprobe (0 for most files).
+
+    Raises:
+        subprocess.CalledProcessError: If the ffprobe command fails.
+        FileNotFoundError: If ffprobe executable is not found.
+    """
+    command = ["ffprobe", "-v", "error", "-show_entries", "format=start_time", "-of", "json", vid_path]
+    result = _run_ffmpeg(command, "probing start time")
+    return float(json.loads(result.stdout).get("format", {}).get("start_time") or 0)
+
+def _probe_video(vid_path: str) -> tuple[int, int, float]:
+    """
+    Reads the display size (width, height) and the duration in seconds of a video using ffprobe.
+    Rotation metadata is taken into account since ffmpeg auto-rotates frames when decoding.
+
+    Raises:
+        subprocess.CalledProcessError: If the ffprobe command fails.
+        FileNotFoundError: If ffprobe executable is not found.
+    """
+    command = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height:stream_tags=rotate:stream_side_data=rotation:format=duration",
+        "-of", "json",
+        vid_path
+    ]
+
+    result = _run_ffmpeg(command, "probing video")
+
+    info = json.loads(result.stdout)
+    stream = info["streams"][0]
+    width, height = int(stream["width"]), int(stream["height"])
+
+    rotation = stream.get("tags", {}).get("rotate", 0)
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    if abs(int(float(rotation))) % 180 == 90:
+        width, height = height, width
+
+    duration = float(info.get("format", {}).get("duration") or 0)
+    return width, height, duration
+
+
+@dataclass(frozen=True)
+class _GeometryPlan:
+    """
+    How every frame of one background video is mapped onto the overlay canvas, decided once per video.
+    """
+    rotate: bool # Rotate the frame 90 degrees clockwise first
+    scale_size: tuple[int, int] # Size the (rotated) frame is resized to
+    source_box: tuple[float, float, float, float] # Region of the (rotated) frame that gets resized
+    paste_position: tuple[int, int] | None # Letterbox offset on a black canvas, None when filling
+    canvas_size: tuple[int, int]
+
+def _plan_geometry(bg_size: tuple, overlay_size: tuple) -> _GeometryPlan:
+    """
+    Decides how a background of `bg_size` fits or fills the overlay's dimensions: a 90 degree rotation
+    when the swapped dimensions match, then 'fit' (letterbox) for wider backgrounds or 'fill' (crop)
+    for taller ones.
     """
     fg_width, fg_height = overlay_size
-    bg_width, bg_height = bg_image.size
+    bg_width, bg_height = bg_size
 
     logger.debug(f"Overlay size: {overlay_size}")
-    logger.debug(f"Original background size: {bg_image.size}")
+    logger.debug(f"Original background size: {bg_size}")
 
     # 1. Check for rotation: if background's swapped dimensions match overlay's dimensions
-    if (math.isclose(bg_height, fg_width, rel_tol=1e-5) and
-        math.isclose(bg_width, fg_height, rel_tol=1e-5)):
+    rotate = (math.isclose(bg_height, fg_width, rel_tol=1e-5) and
+              math.isclose(bg_width, fg_height, rel_tol=1e-5))
+    if rotate:
         logger.info("Rotating background image by -90 degrees for orientation match.")
-        bg_image = bg_image.rotate(-90, expand=True) # Rotate 90 degrees clockwise
-        bg_width, bg_height = bg_image.size # Update dimensions after rotation
-        logger.debug(f"Background size after rotation: {bg_image.size}")
+        bg_width, bg_height = bg_height, bg_width
 
     # 2. Calculate aspect ratios
     bg_aspect = bg_width / bg_height
@@ -171,56 +485,1806 @@ def _smart_resize_background(bg_image: Image.Image, overlay_size: tuple):
     if bg_aspect > fg_aspect:
         # Background is proportionally wider/shorter than foreground. Use 'fit' (letterbox).
         logger.info("Using 'fit' (letterbox) strategy.")
-        scale_factor = fg_height / bg_height
-        new_width = int(bg_width * scale_factor)
+        new_width = int(bg_width * (fg_height / bg_height))
         new_height = fg_height
-        resized_img = bg_image.resize((new_width, new_height), Image.LANCZOS)
-
-        new_background = Image.new("RGB", overlay_size, (0, 0, 0)) # Black background
         paste_x = (fg_width - new_width) // 2
         paste_y = (fg_height - new_height) // 2
-        new_background.paste(resized_img, (paste_x, paste_y))
-        return new_background
-    else:
-        # Background is proportionally taller/thinner or has the same aspect ratio as foreground. Use 'fill' (crop).
-        logger.info("Using 'fill' (crop) strategy.")
-        scale_factor = fg_width / bg_width
-        new_width = fg_width
-        new_height = int(bg_height * scale_factor)
-        resized_img = bg_image.resize((new_width, new_height), Image.LANCZOS)
-
-        left = (new_width - fg_width) // 2
-        top = (new_height - fg_height) // 2
-        right = left + fg_width
-        bottom = top + fg_height
-        cropped_img = resized_img.crop((left, top, right, bottom))
-        return cropped_img
-
-def _process_single_image(file_path: str, idx: int, overlay_image: Image.Image, output_dir: str):
+        if paste_x >= 0:
+            return _GeometryPlan(
+                rotate=rotate,
+                scale_size=(new_width, new_height),
+                source_box=(0, 0, bg_width, bg_height),
+                paste_position=(paste_x, paste_y),
+                canvas_size=overlay_size,
+            )
+        # The scaled background overflows the canvas sideways, so only its visible middle gets resized.
+        scale_x = new_width / bg_width
+        return _GeometryPlan(
+            rotate=rotate,
+            scale_size=overlay_size,
+            source_box=(-paste_x / scale_x, 0, (fg_width - paste_x) / scale_x, bg_height),
+            paste_position=None,
+            canvas_size=overlay_size,
+        )
+
+    # Background is proportionally taller/thinner or has the same aspect ratio as foreground. Use 'fill' (crop).
+    logger.info("Using 'fill' (crop) strategy.")
+    new_width = fg_width
+    new_height = int(bg_height * (fg_width / bg_width))
+    left = (new_width - fg_width) // 2
+    top = (new_height - fg_height) // 2
+
+    # Map the crop box back onto the source, so resize and crop become a single resize call.
+    scale_x, scale_y = new_width / bg_width, new_height / bg_height
+    source_box = (
+        max(0, left / scale_x),
+        max(0, top / scale_y),
+        min(bg_width, (left + fg_width) / scale_x),
+        min(bg_height, (top + fg_height) / scale_y),
+    )
+    return _GeometryPlan(
+        rotate=rotate,
+        scale_size=overlay_size,
+        source_box=source_box,
+        paste_position=None,
+        canvas_size=overlay_size,
+    )
+
+def _apply_geometry(bg_image: Image.Image, plan: _GeometryPlan) -> Image.Image:
+    """
+    Applies a precomputed `_GeometryPlan` to one frame, without any per-frame decisions or logging.
+    """
+    if plan.rotate:
+        bg_image = bg_image.transpose(Image.Transpose.ROTATE_270) # Rotate 90 degrees clockwise
+    resized_img = bg_image.resize(plan.scale_size, Image.LANCZOS, box=plan.source_box)
+    if plan.paste_position is None:
+        return resized_img
+
+    new_background = Image.new("RGB", plan.canvas_size, (0, 0, 0)) # Black background
+    new_background.paste(resized_img, plan.paste_position)
+    return new_background
+
+def _smart_resize_background(bg_image: Image.Image, overlay_size: tuple):
+    """
+    Resizes and potentially rotates the background image to intelligently fit or fill
+    the overlay's dimensions.
+
+    Frames of a video should share one `_plan_geometry` result and use `_apply_geometry` instead.
+    """
+    return _apply_geometry(bg_image, _plan_geometry(bg_image.size, overlay_size))
+
+class _OverlayLayer:
+    """
+    The overlay image reduced to its visible part. The quote PNG is transparent except for the
+    text block, so the alpha bounding box is found once and only that region is blended per frame.
+    """
+
+    def __init__(self, overlay_image: Image.Image):
+        overlay_image = overlay_image.convert("RGBA")
+        self.size = overlay_image.size
+        self.box = overlay_image.getchannel("A").getbbox() or (0, 0, 0, 0)
+        self.image = overlay_image.crop(self.box)
+        self.image.load()
+
+    @property
+    def is_empty(self) -> bool:
+        return self.box[2] <= self.box[0] or self.box[3] <= self.box[1]
+
+    def paste_onto(self, img: Image.Image):
+        if not self.is_empty:
+            img.paste(self.image, self.box[:2], mask=self.image)
+
+def _apply_overlay(img: Image.Image, overlay_image: _OverlayLayer, plan: _GeometryPlan = None) -> Image.Image:
+    """
+    Smart-resizes an RGB background frame (using `plan` when given), converts it to B&W,
+    blurs it and pastes the overlay on top.
+    """
+    img = _apply_geometry(img, plan) if plan else _smart_resize_background(img, overlay_image.size)
+    img = img.convert("L") # Convert background to grayscale
+    img = img.filter(ImageFilter.BoxBlur(_BLUR_RADIUS)) # Apply blur
+    img = img.convert("RGB") # Convert back to RGB for correct overlay pasting
+
+    overlay_image.paste_onto(img)
+    return img
+
+def _process_single_image(
+    file_path: str, idx: int, overlay_image: _OverlayLayer, output_dir: str, plan: _GeometryPlan = None
+):
     """
     Processes a single image frame: opens, smart-resizes, converts to B&W, blurs, and pastes overlay.
     """
     try:
         img: Image.Image = Image.open(file_path).convert("RGB")
-
-        img = _smart_resize_background(img, overlay_image.size)
-        img = img.convert("L") # Convert background to grayscale
-        img = img.filter(ImageFilter.BoxBlur(10)) # Apply blur
-        img = img.convert("RGB") # Convert back to RGB for correct overlay pasting
-
-        img.paste(overlay_image, (0,0), mask=overlay_image)
+        img = _apply_overlay(img, overlay_image, plan)
 
         output_filepath = os.path.join(output_dir, f"final_image_{idx:09d}.png")
         img.save(output_filepath, "PNG")
-        logger.debug(f"Successfully processed and saved: {os.path.basename(file_path)}")
         return True
     except Exception as e:
-        logger.error(f"Error processing image '{os.path.basename(file_path)}' [{e.__class__.__name__}]: {e}")
+        logger.error(
+            f"Error processing image '{os.path.basename(file_path)}' [{e.__class__.__name__}]: {e}",
+            extra={"sample": "frame error"}
+        )
+        return False
+
+def _process_raw_frame(
+    raw: bytes, idx: int, frame_size: tuple, overlay_image: _OverlayLayer, plan: _GeometryPlan = None
+):
+    """
+    Processes a single raw RGB24 frame in memory (see `_process_single_image`).
+    Returns the processed frame as raw RGB24 bytes, or None if processing failed.
+    """
+    try:
+        img = Image.frombuffer("RGB", frame_size, raw, "raw", "RGB", 0, 1)
+        return _apply_overlay(img, overlay_image, plan).tobytes()
+    except Exception as e:
+        logger.error(
+            f"Error processing frame {idx} [{e.__class__.__name__}]: {e}",
+            extra={"sample": "frame error"}
+        )
+        return None
+
+
+# --- Batched NumPy Compositing Kernel ---
+
+class _BatchCompositor:
+    """
+    NumPy version of the grayscale, box blur and overlay paste done by `_apply_overlay`, run on a
+    batch of already smart-resized frames at once. The integer math mirrors Pillow's own
+    (ITU-R 601 luma, fixed point box blur, DIV255 blending), so results match the PIL path.
+
+    All intermediate arrays are allocated once; write backgrounds into `frames[:count]`
+    and call `composite(count)`.
+    """
+
+    def __init__(self, overlay: _OverlayLayer, batch_size: int, blur_radius: int = _BLUR_RADIUS):
+        width, height = overlay.size
+        left, top, right, bottom = overlay.box
+        layer = np.asarray(overlay.image)
+        alpha = layer[..., 3].astype(np.uint32)
+
+        self.size = (width, height)
+        self.batch_size = batch_size
+        self.blur_radius = blur_radius
+        # Only the overlay's bounding box is blended, everything else is the plain background.
+        self._region = (slice(top, bottom), slice(left, right))
+        self.inv_alpha = 255 - alpha
+        # Overlay colour times alpha plus the rounding term of Pillow's DIV255, one plane per channel.
+        self.premultiplied = [layer[..., c].astype(np.uint32) * alpha + 128 for c in range(3)]
+        # White or grey text (the usual case) has identical colour planes, so blend them only once.
+        self._single_plane = all(np.array_equal(self.premultiplied[0], p) for p in self.premultiplied[1:])
+        self._empty = overlay.is_empty
+
+        self.frames = np.empty((batch_size, height, width, 3), np.uint8)
+        self.out = np.empty((batch_size, height, width, 3), np.uint8)
+        self._gray = np.empty((batch_size, height, width), np.uint8)
+        self._blurred = np.empty((batch_size, height, width), np.uint8)
+        self._acc = np.empty((batch_size, height, width), np.uint32)
+        self._tmp = np.empty((batch_size, height, width), np.uint32)
+        # Padded lines and their running sums; shared by the horizontal and the vertical pass.
+        pad = 2 * blur_radius + 3
+        self._scratch = np.empty((2, batch_size * (height + pad) * (width + pad)), np.uint32)
+
+    @staticmethod
+    def working_set(size: tuple, batch_size: int, blur_radius: int = _BLUR_RADIUS) -> int:
+        """
+        Bytes a compositor for `batch_size` frames of `size` (the overlay size) allocates, at most:
+        the overlay planes, plus per frame the input and output frames and the uint8, uint32 and
+        padded scratch buffers of the blur.
+        """
+        width, height = size
+        pad = 2 * blur_radius + 3
+        per_frame = width * height * (3 + 3 + 1 + 1 + 4 + 4) + 2 * 4 * (height + pad) * (width + pad)
+        return width * height * 4 * 4 + batch_size * per_frame
+
+    def composite(self, count: int, out: np.ndarray = None) -> np.ndarray:
+        """
+        Composites `frames[:count]` into `out` (defaults to `self.out[:count]`) and returns it.
+        """
+        if out is None:
+            out = self.out[:count]
+        frames = self.frames[:count]
+        gray, blurred, acc, tmp = self._gray[:count], self._blurred[:count], self._acc[:count], self._tmp[:count]
+
+        # Grayscale: L = (R * 19595 + G * 38470 + B * 7471 + 0x8000) >> 16
+        np.multiply(frames[..., 0], np.uint32(19595), out=acc)
+        np.multiply(frames[..., 1], np.uint32(38470), out=tmp)
+        acc += tmp
+        np.multiply(frames[..., 2], np.uint32(7471), out=tmp)
+        acc += tmp
+        acc += 0x8000
+        acc >>= 16
+        np.copyto(gray, acc, casting="unsafe")
+
+        # Separable box blur: horizontal pass along the rows, then vertical pass along the columns.
+        self._box_blur_lines(gray, blurred, 2, acc)
+        self._box_blur_lines(blurred, gray, 1, acc)
+
+        np.copyto(out, gray[..., None])
+        if self._empty:
+            return out
+
+        # Paste inside the overlay's bounding box: out = DIV255(background * (255 - alpha) + overlay * alpha)
+        rows, cols = self._region
+        region = out[:, rows, cols]
+        acc, tmp = acc[:, rows, cols], tmp[:, rows, cols]
+        np.multiply(gray[:, rows, cols], self.inv_alpha, out=tmp)
+        for c in range(1 if self._single_plane else 3):
+            np.add(tmp, self.premultiplied[c], out=acc)
+            acc += acc >> 8
+            acc >>= 8
+            if self._single_plane:
+                np.copyto(region, acc[..., None], casting="unsafe")
+            else:
+                np.copyto(region[..., c], acc, casting="unsafe")
+        return out
+
+    def _box_blur_lines(self, src, dst, axis, acc):
+        """
+        Box blurs every line of `src` along `axis` into `dst`, with Pillow's fixed point weights
+        and edge clamping.
+        """
+        radius = self.blur_radius
+        length = src.shape[axis]
+        window = 2 * radius + 1
+        padded_shape = list(src.shape)
+        padded_shape[axis] += window + 2
+        padded_size = math.prod(padded_shape)
+        padded = self._scratch[0, :padded_size].reshape(padded_shape)
+        summed = self._scratch[1, :padded_size].reshape(padded_shape)
+        weight = (1 << 24) // window
+        far_weight = ((1 << 24) - window * weight) // 2
+
+        def span(start, stop):
+            index = [slice(None)] * src.ndim
+            index[axis] = slice(start, stop)
+            return tuple(index)
+
+        # padded[1 + k] holds the line clamped at index k - radius - 1, padded[0] is the cumsum's zero.
+        padded[span(0, 1)] = 0
+        padded[span(1, radius + 2)] = src[span(0, 1)]
+        padded[span(radius + 2, radius + 2 + length)] = src
+        padded[span(radius + 2 + length, None)] = src[span(length - 1, length)]
+        np.cumsum(padded, axis=axis, out=summed)
+
+        np.subtract(summed[span(window + 1, window + 1 + length)], summed[span(1, 1 + length)], out=acc)
+        acc *= weight
+        if far_weight:
+            acc += (padded[span(1, 1 + length)] + padded[span(window + 2, window + 2 + length)]) * far_weight
+        acc += 1 << 23
+        acc >>= 24
+        np.copyto(dst, acc, casting="unsafe")
+
+
+# --- Process Pool Backend (overlay loaded once per worker, frames in shared memory) ---
+
+_worker_state = {}
+
+def _init_frame_worker(
+    overlay_image_path: str,
+    inputs_name: str = None,
+    outputs_name: str = None,
+    compositor: str = "pil",
+    log_queue: multiprocessing.Queue = None
+):
+    """
+    Process pool initializer: loads the overlay once and attaches the shared frame buffers, if any.
+    """
+    _configure_worker_logging(log_queue)
+    _worker_state["overlay"] = _load_overlay(overlay_image_path)
+    if compositor == "numpy":
+        _worker_state["compositor"] = _BatchCompositor(_worker_state["overlay"], 1)
+    if inputs_name:
+        _worker_state["inputs"] = shared_memory.SharedMemory(name=inputs_name, track=False)
+        _worker_state["outputs"] = shared_memory.SharedMemory(name=outputs_name, track=False)
+
+def _process_single_image_in_worker(file_path: str, idx: int, output_dir: str, plan: _GeometryPlan = None):
+    """
+    `_process_single_image` with the overlay loaded by `_init_frame_worker`.
+    """
+    return _process_single_image(file_path, idx, _worker_state["overlay"], output_dir, plan)
+
+def _process_shared_frame(slot: int, idx: int, frame_size: tuple, plan: _GeometryPlan) -> bool:
+    """
+    Processes the raw frame in input slot `slot` into output slot `slot` of the shared frame buffers.
+    """
+    overlay = _worker_state["overlay"]
+    in_bytes = frame_size[0] * frame_size[1] * 3
+    out_bytes = overlay.size[0] * overlay.size[1] * 3
+    raw = _worker_state["inputs"].buf[slot * in_bytes:(slot + 1) * in_bytes]
+    output = _worker_state["outputs"].buf[slot * out_bytes:(slot + 1) * out_bytes]
+
+    compositor: _BatchCompositor = _worker_state.get("compositor")
+    if compositor:
+        try:
+            img = Image.frombuffer("RGB", frame_size, raw, "raw", "RGB", 0, 1)
+            compositor.frames[0] = _apply_geometry(img, plan)
+        except Exception as e:
+            logger.error(
+                f"Error processing frame {idx} [{e.__class__.__name__}]: {e}",
+                extra={"sample": "frame error"}
+            )
+            return False
+        # Composite straight into the shared output slot.
+        out = np.ndarray((1, overlay.size[1], overlay.size[0], 3), np.uint8, buffer=output)
+        compositor.composite(1, out=out)
+        return True
+
+    processed = _process_raw_frame(raw, idx, frame_size, overlay, plan)
+    if processed is None:
+        return False
+    output[:] = processed
+    return True
+
+
+# --- Bounded Ordered Pipeline (backpressure between frame producers and consumers) ---
+
+def _frames_in_flight(
+    frame_bytes: int, workers: int, max_frames: int = None, max_mb: float = None, default: int = None
+) -> int:
+    """
+    How many frames a pipeline may hold between reading and writing them: at most `max_frames`
+    and at most `max_mb` megabytes of `frame_bytes` sized frames, `default` (twice the workers)
+    if neither is set.
+    """
+    if max_frames is None and max_mb is None:
+        return default or workers * 2
+    limit = max_frames or sys.maxsize
+    if max_mb:
+        limit = min(limit, int(max_mb * 1024 ** 2) // frame_bytes)
+    return max(1, limit)
+
+@contextmanager
+def _frame_progress(total: int, on_frames=None):
+    """
+    Yields a function advancing the "Image Processing" bar by a number of frames. With `on_frames`
+    no bar is drawn and the counts go to it instead (segment workers report to the parent's bar).
+    """
+    if on_frames:
+        yield on_frames
+        return
+    with Progress() as progress:
+        task = progress.add_task("Image Processing", total=total)
+        yield lambda count: progress.update(task, advance=count)
+
+def _ordered_map(executor, fn, *iterables, limit: int):
+    """
+    `executor.map` with backpressure: the inputs are consumed lazily, at most `limit` calls are
+    submitted but not yet consumed, and results are yielded in input order. Memory stays flat
+    however long the inputs are, and a slow consumer (an encoder pipe) throttles the producer.
+    """
+    in_flight = collections.deque()
+    try:
+        for args in zip(*iterables):
+            if len(in_flight) >= limit:
+                yield in_flight.popleft().result()
+            in_flight.append(executor.submit(fn, *args))
+        while in_flight:
+            yield in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+# --- Duplicate Frame Detection (held frames and static stretches are processed once) ---
+
+def _frame_runs(frames, key=None):
+    """
+    Groups consecutive identical frames (compared directly or by `key`) and yields
+    (1-based index of the first one, first frame, run length). Equal frames give equal results,
+    so each run only has to be processed once. Comparing raw bytes stops at the first differing
+    byte, so frames that change cost next to nothing.
+    """
+    idx = 1
+    for _, run in itertools.groupby(frames, key):
+        frame = next(run)
+        count = 1 + sum(1 for _ in run)
+        yield idx, frame, count
+        idx += count
+
+def _same_frame(a: np.ndarray, b: np.ndarray) -> bool:
+    """
+    Exact comparison of two decoded frames. A sample of rows is compared first,
+    which rejects almost every pair of different frames without reading all of them.
+    """
+    return np.array_equal(a[::16], b[::16]) and np.array_equal(a, b)
+
+def _png_digest(path: str) -> str:
+    """
+    Digest of a decoded PNG frame. ffmpeg encodes identical frames to identical files.
+    """
+    with open(path, "rb") as file:
+        return hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+
+
+# --- Streaming Engine (raw frames over pipes, no temporary images) ---
+
+def _start_ffmpeg(command: list[str], **kwargs) -> sp.Popen:
+    """
+    Starts a long running ffmpeg process. stderr goes to a temporary file instead of a pipe,
+    so a chatty ffmpeg can never block on a full pipe buffer; read it back with `_finish_ffmpeg`.
+
+    Raises:
+        FileNotFoundError: If ffmpeg executable is not found.
+    """
+    logger.debug(f"Starting ffmpeg command: {' '.join(command)}")
+    stderr = tempfile.TemporaryFile()
+    try:
+        process = sp.Popen(command, stderr=stderr, **kwargs)
+    except FileNotFoundError:
+        stderr.close()
+        logger.error("Error: ffmpeg not found. Please ensure ffmpeg is installed and in your system's PATH.")
+        raise FileNotFoundError("ffmpeg not found. Please install ffmpeg and ensure it's in your system's PATH.")
+    process.stderr_file = stderr
+    return process
+
+def _finish_ffmpeg(process: sp.Popen, what: str):
+    """
+    Waits for an ffmpeg process started by `_start_ffmpeg` and checks its exit code.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg exited with a non-zero code.
+    """
+    returncode = process.wait()
+    process.stderr_file.seek(0)
+    stderr = process.stderr_file.read().decode(errors="replace")
+    process.stderr_file.close()
+    if returncode != 0:
+        logger.error(f"Error {what}: {process.args}")
+        logger.error(f"ffmpeg stderr: {stderr}")
+        raise sp.CalledProcessError(returncode, process.args, stderr=stderr)
+
+def _read_raw_frames(stream, frame_bytes: int):
+    """
+    Yields fixed-size raw frames from a binary stream until it is exhausted.
+    """
+    while True:
+        raw = stream.read(frame_bytes)
+        if len(raw) < frame_bytes:
+            if raw:
+                logger.warning(f"Dropping truncated trailing frame ({len(raw)}/{frame_bytes} bytes).")
+            return
+        yield raw
+
+def _read_frame_into(stream, buffer: memoryview) -> bool:
+    """
+    Fills a pre-allocated buffer with the next raw frame from a binary stream.
+    Returns False once the stream is exhausted.
+    """
+    filled = 0
+    while filled < len(buffer):
+        n = stream.readinto(buffer[filled:])
+        if not n:
+            if filled:
+                logger.warning(f"Dropping truncated trailing frame ({filled}/{len(buffer)} bytes).")
+            return False
+        filled += n
+    return True
+
+class _FrameWriter:
+    """
+    Writes processed frames to the encoder in order. A failed frame repeats the previous one;
+    failed frames before the first processed one are held back and written as copies of it,
+    or as black frames if no frame could be processed at all.
+    """
+
+    def __init__(self, stream, frame_bytes: int, on_frame):
+        self.stream = stream
+        self.frame_bytes = frame_bytes
+        self.on_frame = on_frame
+        self.last = None # The last frame written
+        self.held = 0 # Leading frames waiting for the first processed frame
+
+    def _write(self, frame, count: int):
+        for _ in range(count):
+            self.stream.write(frame)
+            self.on_frame()
+
+    def write(self, frame, count: int = 1):
+        """
+        Writes `frame` `count` times, or repeats the previous frame if `frame` is None (failed).
+        """
+        if frame is None:
+            logger.warning(
+                "One or more images failed to process. Repeating the previous frame.",
+                extra={"sample": "frame repeated"}
+            )
+            self.repeat(count)
+            return
+        if self.held:
+            logger.warning(f"The first {self.held} frames failed to process, using the first processed frame for them.")
+            self._write(frame, self.held)
+            self.held = 0
+        self._write(frame, count)
+        self.last = frame
+
+    def repeat(self, count: int = 1):
+        """
+        Writes the previous frame again `count` times (held back if there is none yet).
+        """
+        if self.last is None:
+            self.held += count
+        else:
+            self._write(self.last, count)
+
+    def detach(self):
+        """
+        Copies the last frame, when it is a view of a buffer that is about to be reused.
+        """
+        if isinstance(self.last, memoryview):
+            self.last = bytes(self.last)
+
+    def close(self):
+        if self.held:
+            logger.warning(f"No frame could be processed, writing {self.held} black frames.")
+            self._write(bytes(self.frame_bytes), self.held)
+            self.held = 0
+
+def _pump_frames_threaded(
+    decoder: sp.Popen,
+    encoder: sp.Popen,
+    src_size: tuple,
+    overlay: _OverlayLayer,
+    plan: _GeometryPlan,
+    workers: int,
+    max_in_flight: int,
+    on_frame
+) -> int:
+    """
+    Moves frames from the decoder to the encoder through a thread pool, preserving their order,
+    with at most `max_in_flight` frames read but not yet written.
+    Returns the number of frames written.
+    """
+    src_width, src_height = src_size
+    out_width, out_height = overlay.size
+    writer = _FrameWriter(encoder.stdin, out_width * out_height * 3, on_frame)
+    frame_count = 0
+
+    frames = _read_raw_frames(decoder.stdout, src_width * src_height * 3)
+    runs, pending = itertools.tee(_frame_runs(frames))
+    unique_count = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (_, _, count), processed in zip(pending, _ordered_map(
+            executor,
+            lambda run: _process_raw_frame(run[1], run[0], src_size, overlay, plan),
+            runs,
+            limit=max_in_flight
+        )):
+            writer.write(processed, count)
+            frame_count += count
+            unique_count += 1
+    writer.close()
+    logger.info(f"Processed {unique_count} unique frames out of {frame_count}.")
+    return frame_count
+
+def _composite_raw_batch(
+    runs: list[tuple], src_size: tuple, plan: _GeometryPlan, compositors: queue.SimpleQueue
+):
+    """
+    Smart-resizes a batch of `_frame_runs` (one frame per run) into a free `_BatchCompositor`
+    and composites them. Returns the compositor (with the result in its `out` array), the run
+    lengths and the batch positions of failed frames; the caller puts the compositor back into
+    the queue once the result has been written out.
+    """
+    compositor: _BatchCompositor = compositors.get()
+    failed = set()
+    for i, (idx, raw, _) in enumerate(runs):
+        try:
+            img = Image.frombuffer("RGB", src_size, raw, "raw", "RGB", 0, 1)
+            compositor.frames[i] = _apply_geometry(img, plan)
+        except Exception as e:
+            logger.error(
+                f"Error processing frame {idx} [{e.__class__.__name__}]: {e}",
+                extra={"sample": "frame error"}
+            )
+            failed.add(i)
+            compositor.frames[i] = 0 # Not written, the writer repeats the previous frame
+    compositor.composite(len(runs))
+    return compositor, [count for _, _, count in runs], failed
+
+def _pump_frames_batched(
+    decoder: sp.Popen,
+    encoder: sp.Popen,
+    src_size: tuple,
+    overlay: _OverlayLayer,
+    plan: _GeometryPlan,
+    workers: int,
+    batch_size: int,
+    max_in_flight: int,
+    on_frame
+) -> int:
+    """
+    Moves frames from the decoder to the encoder in batches of `batch_size`, composited by
+    `_BatchCompositor`s on a thread pool (one compositor per batch in flight), preserving their order,
+    with at most `max_in_flight` frames read but not yet written, so the compositors count too.
+    Returns the number of frames written.
+    """
+    src_width, src_height = src_size
+    batch_size = min(batch_size, max_in_flight)
+    max_batches = min(workers, max(1, max_in_flight // batch_size))
+    compositors = queue.SimpleQueue()
+    for _ in range(max_batches):
+        compositors.put(_BatchCompositor(overlay, batch_size))
+
+    frames = _read_raw_frames(decoder.stdout, src_width * src_height * 3)
+    runs = _frame_runs(frames)
+    batches = iter(lambda: list(itertools.islice(runs, batch_size)), [])
+    writer = _FrameWriter(encoder.stdin, overlay.size[0] * overlay.size[1] * 3, on_frame)
+    frame_count = 0
+    unique_count = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # At most one batch per compositor is in flight, so workers never wait for a free compositor.
+        for compositor, counts, failed in _ordered_map(
+            executor,
+            _composite_raw_batch,
+            batches,
+            itertools.repeat(src_size),
+            itertools.repeat(plan),
+            itertools.repeat(compositors),
+            limit=max_batches
+        ):
+            for i, count in enumerate(counts):
+                writer.write(None if i in failed else compositor.out[i].data, count)
+                frame_count += count
+            unique_count += len(counts)
+            writer.detach()
+            compositors.put(compositor)
+    writer.close()
+    logger.info(f"Processed {unique_count} unique frames out of {frame_count}.")
+    return frame_count
+
+def _pump_frames_shared(
+    decoder: sp.Popen,
+    encoder: sp.Popen,
+    src_size: tuple,
+    overlay: _OverlayLayer,
+    plan: _GeometryPlan,
+    overlay_image_path: str,
+    workers: int,
+    compositor: str,
+    max_in_flight: int,
+    on_frame
+) -> int:
+    """
+    Moves frames from the decoder to the encoder through a process pool. Frames never get pickled:
+    the decoder output is read straight into a ring of `max_in_flight` shared memory slots, the workers
+    process slot N in place and the encoder is fed from the matching output slot, in order.
+    Returns the number of frames written.
+    """
+    src_width, src_height = src_size
+    out_width, out_height = overlay.size
+    in_bytes = src_width * src_height * 3
+    out_bytes = out_width * out_height * 3
+    slots = max_in_flight
+
+    inputs = shared_memory.SharedMemory(create=True, size=slots * in_bytes)
+    outputs = shared_memory.SharedMemory(create=True, size=slots * out_bytes)
+    input_frames = np.ndarray((slots, src_height, src_width, 3), np.uint8, buffer=inputs.buf)
+    last_input = np.empty((src_height, src_width, 3), np.uint8)
+    writer = _FrameWriter(encoder.stdin, out_bytes, on_frame)
+    in_flight = collections.deque() # [slot, future, number of identical frames that follow]
+    frame_count = 0
+    unique_count = 0
+
+    def drain_oldest():
+        slot, future, repeats = in_flight.popleft()
+        # Copied out, the slot is reused as soon as it is returned
+        frame = bytes(outputs.buf[slot * out_bytes:(slot + 1) * out_bytes]) if future.result() else None
+        writer.write(frame, 1 + repeats)
+        return slot
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=_MP_CONTEXT,
+            initializer=_init_frame_worker,
+            initargs=(overlay_image_path, inputs.name, outputs.name, compositor, _log_queue)
+        ) as executor:
+            free_slots = collections.deque(range(slots))
+            while True:
+                if not free_slots:
+                    free_slots.append(drain_oldest())
+                slot = free_slots.popleft()
+                if not _read_frame_into(decoder.stdout, inputs.buf[slot * in_bytes:(slot + 1) * in_bytes]):
+                    break
+                frame_count += 1
+                if frame_count > 1 and _same_frame(input_frames[slot], last_input):
+                    # Same input as the previous frame: repeat its result and reuse the slot.
+                    free_slots.appendleft(slot)
+                    if in_flight:
+                        in_flight[-1][2] += 1
+                    else:
+                        writer.repeat()
+                    continue
+                np.copyto(last_input, input_frames[slot])
+                unique_count += 1
+                in_flight.append([slot, executor.submit(_process_shared_frame, slot, frame_count, src_size, plan), 0])
+            while in_flight:
+                drain_oldest()
+        writer.close()
+        logger.info(f"Processed {unique_count} unique frames out of {frame_count}.")
+    finally:
+        del input_frames
+        inputs.close()
+        inputs.unlink()
+        outputs.close()
+        outputs.unlink()
+    return frame_count
+
+@perf.traced("render")
+def _stream_video_with_overlay(
+    video_input_path: str,
+    overlay_image_path: str,
+    overlay: _OverlayLayer,
+    output_video_file: str,
+    target_fps: int,
+    fade_in_duration: float,
+    fade_out_duration: float,
+    audio_source_path: str,
+    backend: str,
+    workers: int,
+    compositor: str,
+    batch_size: int,
+    max_frames_in_flight: int = None,
+    max_mb_in_flight: float = None,
+    window: tuple = None,
+    on_frames=None
+):
+    """
+    Streams the whole workflow without intermediate images: a decoding ffmpeg writes raw RGB24
+    frames to a pipe, the frames are processed in memory and written straight into the stdin of
+    an encoding ffmpeg. The number of frames between the two pipes is capped by
+    `max_frames_in_flight` / `max_mb_in_flight`. With a `window` only those frames are rendered.
+    With `on_frames` progress goes to it instead of a progress bar.
+
+    Raises:
+        subprocess.CalledProcessError: If either ffmpeg process fails.
+        FileNotFoundError: If ffmpeg or ffprobe executables are not found.
+    """
+    src_width, src_height, src_duration = _probe_video(video_input_path)
+    src_size = (src_width, src_height)
+    out_width, out_height = overlay.size
+    plan = _plan_geometry(src_size, overlay.size)
+    expected_frames = window[1] if window else max(1, round(src_duration * _DECODE_FPS))
+    total_video_duration = _get_video_duration(expected_frames, target_fps)
+    batched = compositor == "numpy" and backend == "thread"
+    if batched:
+        # Processed frames live in the compositors, whose blur buffers are most of the memory.
+        frame_bytes = src_width * src_height * 3 + _BatchCompositor.working_set(overlay.size, batch_size) // batch_size
+    else:
+        frame_bytes = (src_width * src_height + out_width * out_height) * 3
+    max_in_flight = _frames_in_flight(
+        frame_bytes, workers, max_frames_in_flight, max_mb_in_flight,
+        default=workers * batch_size if batched else None
+    )
+
+    if window:
+        seek_args, window_filters = _window_args(window)
+        # The window filters already produce the _DECODE_FPS frames, passthrough keeps the muxer from
+        # retiming them against the original (copyts) timestamps, which drops frames.
+        decode_args = ["-vf", ",".join(window_filters), "-fps_mode", "passthrough"]
+    else:
+        seek_args, decode_args = [], ["-r", str(_DECODE_FPS)]
+    decode_command = [
+        "ffmpeg", "-v", "error",
+        *seek_args,
+        "-i", video_input_path,
+        *decode_args,
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        "pipe:1"
+    ]
+
+    encode_command = [
+        "ffmpeg", "-v", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        "-s", f"{out_width}x{out_height}",
+        "-framerate", str(target_fps),
+        "-i", "pipe:0"
+    ]
+    audio_source_path = _resolve_audio_path(audio_source_path)
+    if audio_source_path:
+        encode_command.extend(["-i", audio_source_path])
+    encode_command.extend(_build_encode_args(
+        "format=yuv420p", fade_in_duration, fade_out_duration, total_video_duration, bool(audio_source_path)
+    ))
+    encode_command.extend(["-y", output_video_file])
+
+    logger.info(f"Streaming frames through {workers} {backend} workers into '{output_video_file}'...")
+
+    decoder = _start_ffmpeg(decode_command, stdout=sp.PIPE)
+    encoder = _start_ffmpeg(encode_command, stdin=sp.PIPE)
+    frame_count = 0
+    try:
+        with _frame_progress(expected_frames, on_frames) as advance:
+            on_frame = lambda: advance(1)
+            if backend == "process":
+                frame_count = _pump_frames_shared(
+                    decoder, encoder, src_size, overlay, plan, overlay_image_path, workers, compositor,
+                    max_in_flight, on_frame
+                )
+            elif batched:
+                frame_count = _pump_frames_batched(
+                    decoder, encoder, src_size, overlay, plan, workers, batch_size, max_in_flight, on_frame
+                )
+            else:
+                frame_count = _pump_frames_threaded(
+                    decoder, encoder, src_size, overlay, plan, workers, max_in_flight, on_frame
+                )
+    except BrokenPipeError:
+        # The encoder died; its own error is reported below.
+        decoder.kill()
+    except BaseException:
+        decoder.kill()
+        encoder.kill()
+        raise
+    finally:
+        decoder.stdout.close()
+        try:
+            encoder.stdin.close()
+        except BrokenPipeError:
+            pass
+
+    _finish_ffmpeg(encoder, "creating video")
+    _finish_ffmpeg(decoder, "decompressing video")
+    if frame_count == 0:
+        raise ValueError(f"No frames decoded from {video_input_path}")
+    perf.add_frames(frame_count)
+    logger.info(f"Video '{output_video_file}' created successfully from {frame_count} streamed frames.")
+
+
+# --- Checkpoints (resumable frames and spool renders) ---
+
+_MANIFEST = "manifest.json"
+# Minimum seconds between manifest rewrites while frames are being processed
+_CHECKPOINT_INTERVAL = 2.0
+
+def _frame_ranges(indices) -> list[list[int]]:
+    """
+    Compresses frame indices into sorted, inclusive [first, last] ranges.
+    """
+    ranges = []
+    for idx in sorted(indices):
+        if ranges and idx == ranges[-1][1] + 1:
+            ranges[-1][1] = idx
+        else:
+            ranges.append([idx, idx])
+    return ranges
+
+def _is_complete_png(path: str) -> bool:
+    """
+    Cheap validity check for a processed frame: the file exists and ends with the PNG IEND chunk,
+    so frames cut short by a crash are processed again.
+    """
+    try:
+        with open(path, "rb") as file:
+            file.seek(-12, os.SEEK_END)
+            return file.read(8) == b"\x00\x00\x00\x00IEND"
+    except OSError:
         return False
 
 
+class _Checkpoint:
+    """
+    The resume manifest of a frames or spool render: a small JSON file in temp_dir_base recording
+    the inputs it belongs to, whether decoding finished and which frames are processed.
+    Without a key nothing is written, so the engines can record progress unconditionally.
+    """
+
+    def __init__(self, temp_dir_base: str, key: str = None):
+        self.path = os.path.join(temp_dir_base, _MANIFEST)
+        self.key = key
+        self.decoded = False
+        self.frame_count = 0
+        self.done = set()
+        self._saved_at = time.monotonic()
+
+    @classmethod
+    def open(cls, temp_dir_base: str, key: str) -> "_Checkpoint":
+        """
+        Loads the manifest in temp_dir_base if it was written for `key`. Otherwise the directory
+        holds another render's frames and is cleared.
+        """
+        checkpoint = cls(temp_dir_base, key)
+        try:
+            with open(checkpoint.path) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            manifest = {}
+
+        if manifest.get("key") == key:
+            checkpoint.decoded = manifest["decoded"]
+            checkpoint.frame_count = manifest["frame_count"]
+            for first, last in manifest["processed"]:
+                checkpoint.done.update(range(first, last + 1))
+            logger.info(
+                f"Resuming from '{checkpoint.path}': decoded={checkpoint.decoded}, "
+                f"{len(checkpoint.done)}/{checkpoint.frame_count} frames already processed."
+            )
+        elif os.path.exists(temp_dir_base):
+            logger.info(f"'{temp_dir_base}' does not belong to this render, starting over.")
+            shutil.rmtree(temp_dir_base)
+        return checkpoint
+
+    def save(self):
+        """
+        Atomically rewrites the manifest (write, fsync, rename).
+        """
+        if not self.key:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        manifest = {
+            "key": self.key,
+            "decoded": self.decoded,
+            "frame_count": self.frame_count,
+            "processed": _frame_ranges(self.done),
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(manifest, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+
+    def mark_decoded(self, frame_count: int):
+        self.decoded = True
+        self.frame_count = frame_count
+        self.save()
+
+    def record(self, indices, flush=None):
+        """
+        Marks frames as processed. The manifest is rewritten at most every `_CHECKPOINT_INTERVAL`
+        seconds, after `flush` (if given) has made the processed frames durable.
+        """
+        self.done.update(indices)
+        if self.key and time.monotonic() - self._saved_at >= _CHECKPOINT_INTERVAL:
+            if flush:
+                flush()
+            self.save()
+
+
+def _remove_temp_dir(temp_dir_base: str, resume: bool = False):
+    """
+    Removes temp_dir_base after a failure, unless it is kept for a resumed run.
+    """
+    if resume:
+        logger.info(f"Keeping '{temp_dir_base}' so the render can be resumed.")
+    elif os.path.exists(temp_dir_base):
+        shutil.rmtree(temp_dir_base)
+
+
+# --- Spool Engine (memory-mapped raw frame files instead of PNG directories) ---
+
+def _open_spools(decoded_spool: str, processed_spool: str, src_size: tuple, out_size: tuple):
+    """
+    Memory-maps the decoded spool (read only) and the processed spool (read/write) as
+    (frames, height, width, 3) arrays. The processed spool is created with the same frame count.
+    """
+    frame_count = os.path.getsize(decoded_spool) // (src_size[0] * src_size[1] * 3)
+    processed_bytes = frame_count * out_size[0] * out_size[1] * 3
+    if not os.path.exists(processed_spool) or os.path.getsize(processed_spool) != processed_bytes:
+        with open(processed_spool, "wb") as file:
+            file.truncate(processed_bytes)
+
+    inputs = np.memmap(decoded_spool, np.uint8, "r", shape=(frame_count, src_size[1], src_size[0], 3))
+    outputs = np.memmap(processed_spool, np.uint8, "r+", shape=(frame_count, out_size[1], out_size[0], 3))
+    return inputs, outputs
+
+def _process_spool_range(
+    inputs: np.ndarray,
+    outputs: np.ndarray,
+    start: int,
+    stop: int,
+    overlay: _OverlayLayer,
+    plan: _GeometryPlan,
+    compositor: _BatchCompositor = None
+) -> tuple[list[int], list[int]]:
+    """
+    Processes frames [start, stop) of the decoded spool straight into the processed spool.
+    With a compositor the whole range (at most its batch size) is composited in place.
+    A frame identical to the previous one is not processed but copied from its result; when that
+    result belongs to another range, the copy is left to the caller.
+    Returns the indices of frames that failed to process and of frames left to the caller.
+    """
+    src_size = (inputs.shape[2], inputs.shape[1])
+    failed, deferred = [], []
+    unique = []
+    sources = {} # duplicate frame -> processed frame of this range it repeats
+    for i in range(start, stop):
+        if i and _same_frame(inputs[i], inputs[i - 1]):
+            if unique:
+                sources[i] = unique[-1]
+            else:
+                deferred.append(i)
+        else:
+            unique.append(i)
+
+    for k, i in enumerate(unique):
+        try:
+            img = Image.frombuffer("RGB", src_size, inputs[i], "raw", "RGB", 0, 1)
+            if compositor:
+                compositor.frames[k] = _apply_geometry(img, plan)
+            else:
+                outputs[i] = _apply_overlay(img, overlay, plan)
+        except Exception as e:
+            logger.error(
+                f"Error processing frame {i + 1} [{e.__class__.__name__}]: {e}",
+                extra={"sample": "frame error"}
+            )
+            failed.append(i)
+            if compositor:
+                compositor.frames[k] = 0
+    if compositor and len(unique) == stop - start:
+        compositor.composite(stop - start, out=outputs[start:stop])
+    elif compositor and unique:
+        outputs[unique] = compositor.composite(len(unique))
+
+    for i, source in sources.items():
+        if source in failed:
+            failed.append(i)
+        else:
+            outputs[i] = outputs[source]
+    return failed, deferred
+
+def _init_spool_worker(
+    overlay_image_path: str,
+    decoded_spool: str,
+    processed_spool: str,
+    src_size: tuple,
+    compositor: str,
+    batch_size: int,
+    log_queue: multiprocessing.Queue = None
+):
+    """
+    Process pool initializer for the spool engine: loads the overlay once and maps both spools,
+    so workers read and write frames in place.
+    """
+    _configure_worker_logging(log_queue)
+    overlay = _worker_state["overlay"] = _load_overlay(overlay_image_path)
+    _worker_state["spools"] = _open_spools(decoded_spool, processed_spool, src_size, overlay.size)
+    if compositor == "numpy":
+        _worker_state["compositor"] = _BatchCompositor(overlay, batch_size)
+
+def _process_spool_range_in_worker(start: int, stop: int, plan: _GeometryPlan) -> tuple[list[int], list[int]]:
+    """
+    `_process_spool_range` with the state set up by `_init_spool_worker`.
+    """
+    inputs, outputs = _worker_state["spools"]
+    return _process_spool_range(
+        inputs, outputs, start, stop, _worker_state["overlay"], plan, _worker_state.get("compositor")
+    )
+
+def _process_spool(
+    decoded_spool: str,
+    processed_spool: str,
+    src_size: tuple,
+    overlay: _OverlayLayer,
+    overlay_image_path: str,
+    plan: _GeometryPlan,
+    backend: str,
+    workers: int,
+    compositor: str,
+    batch_size: int,
+    on_frames,
+    checkpoint: _Checkpoint = None
+) -> int:
+    """
+    Processes every frame of the decoded spool into the processed spool, in ranges of `batch_size`
+    frames, on a thread or process pool. Failed frames repeat the previous frame, and so do frames
+    identical to it, without being processed again.
+    Ranges the checkpoint already holds are skipped, finished ones are recorded in it.
+    Returns the number of frames.
+    """
+    inputs, outputs = _open_spools(decoded_spool, processed_spool, src_size, overlay.size)
+    frame_count = len(inputs)
+    checkpoint = checkpoint or _Checkpoint(os.path.dirname(processed_spool))
+    ranges = []
+    for start in range(0, frame_count, batch_size):
+        stop = min(start + batch_size, frame_count)
+        if checkpoint.done.issuperset(range(start, stop)):
+            on_frames(stop - start)
+        else:
+            ranges.append((start, stop))
+    failed, deferred = [], []
+
+    def finish_range(start, stop, result):
+        range_failed, range_deferred = result
+        failed.extend(range_failed)
+        deferred.extend(range_deferred)
+        # Deferred duplicates are only copied below, so a resumed run has to revisit their range.
+        checkpoint.record(set(range(start, stop)).difference(range_failed, range_deferred), flush=outputs.flush)
+        on_frames(stop - start)
+
+    if backend == "process":
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=_MP_CONTEXT,
+            initializer=_init_spool_worker,
+            initargs=(
+                overlay_image_path, decoded_spool, processed_spool, src_size, compositor, batch_size, _log_queue
+            )
+        )
+        with executor:
+            for (start, stop), result in zip(ranges, _ordered_map(
+                executor,
+                _process_spool_range_in_worker,
+                [start for start, _ in ranges],
+                [stop for _, stop in ranges],
+                itertools.repeat(plan),
+                limit=workers * 2
+            )):
+                finish_range(start, stop, result)
+    else:
+        compositors = queue.SimpleQueue()
+        if compositor == "numpy":
+            for _ in range(workers):
+                compositors.put(_BatchCompositor(overlay, batch_size))
+
+        def process_range(start, stop):
+            kernel = compositors.get() if compositor == "numpy" else None
+            try:
+                return _process_spool_range(inputs, outputs, start, stop, overlay, plan, kernel)
+            finally:
+                if kernel:
+                    compositors.put(kernel)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for (start, stop), result in zip(ranges, _ordered_map(
+                executor, process_range, [start for start, _ in ranges], [stop for _, stop in ranges],
+                limit=workers * 2
+            )):
+                finish_range(start, stop, result)
+
+    if failed:
+        logger.warning(
+            "One or more images failed to process. Repeating the previous frame.",
+            extra={"sample": "frame repeated"}
+        )
+    pending = sorted(failed + deferred)
+    if pending and pending[0] == 0:
+        # Frames failing before the first processed one have no previous frame to repeat.
+        bad = set(pending)
+        first = next((i for i in range(frame_count) if i not in bad), None)
+        if first is None:
+            logger.warning(f"No frame could be processed, writing {frame_count} black frames.")
+            outputs[:] = 0
+            pending = []
+        else:
+            logger.warning(f"The first {first} frames failed to process, using the first processed frame for them.")
+            outputs[:first] = outputs[first]
+            pending = [i for i in pending if i > first]
+    # In frame order, so runs of repeated frames copy the already repeated ones before them.
+    for i in pending:
+        outputs[i] = outputs[i - 1]
+    outputs.flush()
+    checkpoint.save()
+    del inputs, outputs
+    return frame_count
+
+
+def _render_with_spool(
+    video_input_path: str,
+    overlay_image_path: str,
+    overlay: _OverlayLayer,
+    output_video_file: str,
+    temp_dir_base: str,
+    target_fps: int,
+    fade_in_duration: float,
+    fade_out_duration: float,
+    audio_source_path: str,
+    backend: str,
+    workers: int,
+    compositor: str,
+    batch_size: int,
+    checkpoint: _Checkpoint = None,
+    max_frames_in_flight: int = None,
+    max_mb_in_flight: float = None
+):
+    """
+    The frames engine with raw RGB24 spool files instead of PNG directories: ffmpeg decodes into
+    one spool file, the frames are processed in place through memory maps and the processed spool
+    is fed to the encoder as rawvideo. With a checkpoint, work it records as done is skipped.
+    The frames stay in the spool files, so `max_frames_in_flight` / `max_mb_in_flight` only bound
+    the buffers of the "numpy" compositors (one per worker, holding one batch each).
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg or ffprobe fails.
+        FileNotFoundError: If ffmpeg or ffprobe executables are not found.
+        ValueError: If no frames were decoded.
+    """
+    output_images_dir = os.path.join(temp_dir_base, "decompressed_frames")
+    final_images_dir = os.path.join(temp_dir_base, "processed_frames")
+    decoded_spool = os.path.join(output_images_dir, _DECODED_SPOOL)
+    processed_spool = os.path.join(final_images_dir, _PROCESSED_SPOOL)
+
+    src_width, src_height, _ = _probe_video(video_input_path)
+    src_size = (src_width, src_height)
+    plan = _plan_geometry(src_size, overlay.size)
+    frame_bytes = src_width * src_height * 3
+    checkpoint = checkpoint or _Checkpoint(temp_dir_base)
+    if compositor == "numpy":
+        max_in_flight = _frames_in_flight(
+            _BatchCompositor.working_set(overlay.size, batch_size) // batch_size, workers,
+            max_frames_in_flight, max_mb_in_flight, default=workers * batch_size
+        )
+        batch_size = min(batch_size, max_in_flight)
+        workers = min(workers, max(1, max_in_flight // batch_size))
+
+    if checkpoint.decoded and os.path.exists(decoded_spool) \
+            and os.path.getsize(decoded_spool) == checkpoint.frame_count * frame_bytes:
+        logger.info(f"Reusing {checkpoint.frame_count} decoded frames from '{decoded_spool}'.")
+    else:
+        with perf.span("decode") as stage:
+            _decompress_video(video_input_path, output_images_dir, spool=True)
+            stage.frames = os.path.getsize(decoded_spool) // frame_bytes
+        checkpoint.done.clear()
+        checkpoint.mark_decoded(stage.frames)
+    total_frames = checkpoint.frame_count
+    if not total_frames:
+        logger.error(f"No frames found in '{decoded_spool}'. Exiting.")
+        raise ValueError(f"No frames found in {decoded_spool}")
+
+    os.makedirs(final_images_dir, exist_ok=True)
+    logger.info(f"Processing {total_frames} spooled frames using {workers} {backend} workers...")
+    with perf.span("frame_processing", frames=total_frames - len(checkpoint.done)), Progress() as progress:
+        task = progress.add_task("Image Processing", total=total_frames)
+        _process_spool(
+            decoded_spool,
+            processed_spool,
+            src_size,
+            overlay,
+            overlay_image_path,
+            plan,
+            backend,
+            workers,
+            compositor,
+            batch_size,
+            on_frames=lambda count: progress.update(task, advance=count),
+            checkpoint=checkpoint
+        )
+
+    _combine_image_dir_to_video(
+        final_images_dir,
+        output_video_file,
+        vf="format=yuv420p",
+        fps=target_fps,
+        fade_in_duration=fade_in_duration,
+        fade_out_duration=fade_out_duration,
+        audio_file_path=audio_source_path,
+        spool_size=overlay.size
+    )
+
+
+# --- Filtergraph Engine (the whole overlay flow as one ffmpeg invocation) ---
+
+def _build_background_filters(plan: _GeometryPlan, blur_radius: int = _BLUR_RADIUS) -> list[str]:
+    """
+    Translates a `_GeometryPlan` plus the B&W conversion and blur of `_apply_overlay` into ffmpeg filters.
+    """
+    filters = []
+    if plan.rotate:
+        filters.append("transpose=clock") # Rotate 90 degrees clockwise
+    left, top, right, bottom = (round(v) for v in plan.source_box)
+    filters.append(f"crop={right - left}:{bottom - top}:{left}:{top}")
+    filters.append(f"scale={plan.scale_size[0]}:{plan.scale_size[1]}:flags=lanczos")
+    if plan.paste_position is not None:
+        canvas_width, canvas_height = plan.canvas_size
+        paste_x, paste_y = plan.paste_position
+        filters.append(f"pad={canvas_width}:{canvas_height}:{paste_x}:{paste_y}:black")
+    filters.append("format=gray")
+    filters.append(f"boxblur={blur_radius}:1")
+    return filters
+
+@perf.traced("render")
+def _render_with_filtergraph(
+    video_input_path: str,
+    overlay_image_path: str,
+    overlay: _OverlayLayer,
+    output_video_file: str,
+    target_fps: int,
+    fade_in_duration: float,
+    fade_out_duration: float,
+    audio_source_path: str,
+    preprocessed: bool = False,
+    window: tuple = None,
+    on_frames=None
+):
+    """
+    Renders the overlay flow as a single ffmpeg filter_complex: decode, smart resize/rotate, B&W,
+    blur, overlay, fades and the yuv420p encode all happen inside ffmpeg, no frame enters Python.
+    With `preprocessed` the input comes from `_prepare_background` and only the overlay and encode are left.
+    With a `window` only those frames are rendered. With `on_frames` progress goes to it instead of a progress bar.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg or ffprobe fails.
+        FileNotFoundError: If ffmpeg or ffprobe executables are not found.
+    """
+    src_width, src_height, src_duration = _probe_video(video_input_path)
+    expected_frames = window[1] if window else max(1, round(src_duration * _DECODE_FPS))
+    total_video_duration = _get_video_duration(expected_frames, target_fps)
+    seek_args, window_filters = _window_args(window) if window else ([], [f"fps={_DECODE_FPS}"])
+
+    # Decode at _DECODE_FPS and retime to target_fps, exactly like the frame based engines do.
+    if preprocessed:
+        background = [f"setpts=N/({target_fps}*TB)"]
+    else:
+        plan = _plan_geometry((src_width, src_height), overlay.size)
+        background = window_filters + [f"setpts=N/({target_fps}*TB)"] + _build_background_filters(plan)
+    background.append("format=rgb24")
+    final = ["format=yuv420p"] + _build_fade_filters(fade_in_duration, fade_out_duration, total_video_duration)
+    if overlay.is_empty:
+        filter_graph = f"[0:v]{','.join(background + final)}[v]"
+    else:
+        # Only the overlay's bounding box gets blended onto the background.
+        left, top, right, bottom = overlay.box
+        filter_graph = (
+            f"[0:v]{','.join(background)}[bg];"
+            f"[1:v]crop={right - left}:{bottom - top}:{left}:{top}[text];"
+            f"[bg][text]overlay={left}:{top}:format=rgb,{','.join(final)}[v]"
+        )
+
+    command = [
+        "ffmpeg", "-v", "error", "-nostats", "-progress", "pipe:1",
+        *seek_args,
+        "-i", video_input_path,
+        "-i", overlay_image_path
+    ]
+    audio_source_path = _resolve_audio_path(audio_source_path)
+    if audio_source_path:
+        command.extend(["-i", audio_source_path])
+    command.extend(["-filter_complex", filter_graph, "-map", "[v]", "-r", str(target_fps)])
+    command.extend(_VIDEO_CODEC_ARGS)
+    if audio_source_path:
+        command.extend(["-map", "2:a:0", "-shortest"] + _AUDIO_CODEC_ARGS)
+    command.extend(["-y", output_video_file])
+
+    logger.info(f"Rendering '{output_video_file}' with a single ffmpeg filtergraph...")
+    process = _start_ffmpeg(command, stdout=sp.PIPE, text=True)
+    frame_count = 0
+    with _frame_progress(expected_frames, on_frames) as advance:
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            if key == "frame" and value.isdigit() and int(value) > frame_count:
+                advance(int(value) - frame_count)
+                frame_count = int(value)
+    process.stdout.close()
+    _finish_ffmpeg(process, "creating video")
+    perf.add_frames(frame_count)
+    logger.info(f"Video '{output_video_file}' created successfully.")
+
+
+# --- Preprocessed Background Cache ---
+
+_background_cache: ArtifactCache = None
+
+def _get_background_cache() -> ArtifactCache:
+    global _background_cache
+    if _background_cache is None:
+        _background_cache = ArtifactCache("backgrounds", max_bytes=_BACKGROUND_CACHE_MAX_BYTES)
+    return _background_cache
+
+@perf.traced("background_prep")
+def _prepare_background(video_input_path: str, overlay_size: tuple) -> str:
+    """
+    Returns a lossless (FFV1, gray) copy of the background video that is already decoded at
+    _DECODE_FPS, smart-resized to `overlay_size`, B&W and blurred. It is built once and kept in
+    the background cache, keyed by the video's content hash, the size, the blur radius and the fps.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg or ffprobe fails.
+        FileNotFoundError: If ffmpeg or ffprobe executables are not found.
+    """
+    cache = _get_background_cache()
+    key = make_key("background", file_digest(video_input_path), list(overlay_size), _BLUR_RADIUS, _DECODE_FPS)
+    cached = cache.get(key, ".mkv")
+    if cached:
+        logger.info(f"Using cached preprocessed background '{cached}'.")
+        return cached
+
+    src_width, src_height, _ = _probe_video(video_input_path)
+    plan = _plan_geometry((src_width, src_height), overlay_size)
+    filters = [f"fps={_DECODE_FPS}"] + _build_background_filters(plan)
+    temp_path = cache.temp_path(".mkv")
+
+    command = [
+        "ffmpeg",
+        "-i", video_input_path,
+        "-vf", ",".join(filters),
+        "-an",
+        "-c:v", "ffv1", "-level", "3", "-pix_fmt", "gray",
+        "-y", temp_path
+    ]
+
+    logger.info(f"Preprocessing background '{video_input_path}' into the cache...")
+    try:
+        _run_ffmpeg(command, "preprocessing background")
+    except sp.CalledProcessError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return cache.put(key, ".mkv", temp_path)
+
+
+# --- Audio Section Cache ---
+
+_audio_cache: ArtifactCache = None
+
+def _get_audio_cache() -> ArtifactCache:
+    global _audio_cache
+    if _audio_cache is None:
+        _audio_cache = ArtifactCache("audio", max_bytes=_AUDIO_CACHE_MAX_BYTES)
+    return _audio_cache
+
+@perf.traced("audio_prep")
+def _prepare_audio_section(
+    audio_path: str,
+    section: tuple,
+    duration: float = None,
+    fade_in_duration: float = 0,
+    fade_out_duration: float = 0
+) -> str:
+    """
+    Returns the (start, end) `section` of an audio file, cut to at most `duration` seconds, with
+    the fades baked in and encoded as AAC, ready to be stream copied into an mp4. It is extracted
+    once with a fast seek and kept in the audio cache, keyed by the file's content hash and the arguments.
+
+    Raises:
+        subprocess.CalledProcessError: If the ffmpeg command fails.
+        FileNotFoundError: If the audio file or ffmpeg executable is not found.
+    """
+    if not os.path.exists(audio_path):
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+    start, end = section
+    length = end - start
+    if duration:
+        length = min(length, duration)
+    cache = _get_audio_cache()
+    key = make_key(
+        "audio_section", file_digest(audio_path), start, length, fade_in_duration, fade_out_duration, _AUDIO_CODEC_ARGS
+    )
+    cached = cache.get(key, ".m4a")
+    if cached:
+        logger.info(f"Using cached audio section '{cached}'.")
+        return cached
+
+    filters = []
+    if fade_in_duration > 0:
+        filters.append(f"afade=t=in:st=0:d={fade_in_duration}")
+    if fade_out_duration > 0:
+        filters.append(f"afade=t=out:st={max(0, length - fade_out_duration)}:d={fade_out_duration}")
+    temp_path = cache.temp_path(".m4a")
+
+    command = ["ffmpeg", "-ss", str(start), "-t", str(length), "-i", audio_path, "-vn"]
+    if filters:
+        command.extend(["-af", ",".join(filters)])
+    command.extend(_AUDIO_CODEC_ARGS + ["-y", temp_path])
+
+    logger.info(f"Extracting audio section {start}-{start + length}s of '{audio_path}' into the cache...")
+    try:
+        _run_ffmpeg(command, "extracting audio section")
+    except sp.CalledProcessError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return cache.put(key, ".m4a", temp_path)
+
+def _mux_audio(video_path: str, audio_path: str, output_path: str):
+    """
+    Muxes an audio track into a video without re-encoding the video (or AAC audio).
+
+    Raises:
+        subprocess.CalledProcessError: If the ffmpeg command fails.
+        FileNotFoundError: If ffmpeg executable is not found.
+    """
+    command = [
+        "ffmpeg",
+        "-i", video_path,
+        "-i", audio_path,
+        "-map", "0:v:0", "-map", "1:a:0", "-shortest",
+        "-c:v", "copy",
+        *_audio_codec_args(audio_path),
+        "-y", output_path
+    ]
+    _run_ffmpeg(command, "muxing audio")
+
+
+def _render_still_image(
+    image_path: str,
+    output_path: str,
+    duration: float,
+    fps: int = _STILL_FPS,
+    fade_in_duration: float = 0,
+    fade_out_duration: float = 0,
+    audio_path: str = None,
+    preset: str = _STILL_PRESET
+):
+    """
+    Encodes a still image (with fades and an optional audio track) as a video in a
+    single ffmpeg pass, looping the decoded image instead of generating every frame.
+
+    Matches the moviepy ImageClip render, and the AAC audio sections from
+    `_prepare_audio_section` are stream copied.
+
+    Raises:
+        subprocess.CalledProcessError: If the ffmpeg command fails.
+        FileNotFoundError: If ffmpeg executable is not found.
+    """
+    # rgb24 like moviepy's writer: alpha is dropped and libx264 picks the same pixel format.
+    video_filters = [
+        "format=rgb24",
+        *_build_fade_filters(fade_in_duration, fade_out_duration, duration),
+    ]
+    command = [
+        "ffmpeg",
+        "-loop", "1", "-framerate", str(fps), "-t", str(duration), "-i", image_path,
+    ]
+    if audio_path:
+        command += ["-i", audio_path]
+    command += [
+        "-vf", ",".join(video_filters),
+        "-c:v", _STILL_CODEC, "-preset", preset, "-tune", _STILL_TUNE, "-r", str(fps),
+    ]
+    if audio_path:
+        # -t rather than -shortest: -shortest cuts an encoded video short next to a copied track.
+        command += ["-map", "0:v:0", "-map", "1:a:0", *_audio_codec_args(audio_path)]
+    command += ["-t", str(duration), "-y", output_path]
+
+    _run_ffmpeg(command, "rendering still image")
+
+
+# --- Render Cache (finished videos addressed by their inputs and settings) ---
+
+_render_cache: ArtifactCache = None
+
+def _get_render_cache() -> ArtifactCache:
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = ArtifactCache("renders", max_bytes=_RENDER_CACHE_MAX_BYTES)
+    return _render_cache
+
+def _restore_render(key: str, output_path: str) -> bool:
+    """
+    Copies the cached video for `key` to `output_path`, if there is one. Returns whether it did.
+    """
+    suffix = os.path.splitext(output_path)[1] or ".mp4"
+    cached = _get_render_cache().get(key, suffix)
+    if not cached:
+        return False
+
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    shutil.copyfile(cached, temp_path)
+    os.replace(temp_path, output_path)
+    logger.info(f"Using cached render '{cached}' for '{output_path}'.")
+    return True
+
+def _store_render(key: str, output_path: str) -> str:
+    """
+    Keeps a copy of a finished video in the render cache under `key` (if given) and returns its path.
+    Copies rather than hard links, as ffmpeg -y rewrites an existing output file in place.
+    """
+    if key and os.path.exists(output_path):
+        cache = _get_render_cache()
+        suffix = os.path.splitext(output_path)[1] or ".mp4"
+        temp_path = cache.temp_path(suffix)
+        shutil.copyfile(output_path, temp_path)
+        cache.put(key, suffix, temp_path)
+    return output_path
+
+
+# --- Segment-Parallel Rendering (independent time segments joined without re-encoding) ---
+
+def _segment_windows(total_frames: int, segments: int, start_time: float = 0) -> list[tuple]:
+    """
+    Splits `total_frames` frames into at most `segments` (first, count, start_time) windows of equal length.
+    """
+    per_segment = math.ceil(total_frames / segments)
+    return [
+        (first, min(per_segment, total_frames - first), start_time)
+        for first in range(0, total_frames, per_segment)
+    ]
+
+def _init_segment_worker(progress_queue: multiprocessing.Queue, log_queue: multiprocessing.Queue = None):
+    """
+    Process pool initializer for segment workers: frame counts are sent to the parent through
+    `progress_queue`, which draws the only progress bar.
+    """
+    _configure_worker_logging(log_queue)
+    _worker_state["progress"] = progress_queue
+
+def _render_segment(
+    video_input_path: str,
+    overlay_image_path: str,
+    segment_file: str,
+    window: tuple,
+    target_fps: int,
+    fade_in_duration: float,
+    fade_out_duration: float,
+    engine: str,
+    backend: str,
+    workers: int,
+    compositor: str,
+    batch_size: int
+) -> str:
+    """
+    Renders one segment (video only) in a worker process with the "stream" or "ffmpeg" engine.
+    """
+    overlay = _load_overlay(overlay_image_path)
+    on_frames = _worker_state["progress"].put
+    if engine == "ffmpeg":
+        _render_with_filtergraph(
+            video_input_path,
+            overlay_image_path,
+            overlay,
+            segment_file,
+            target_fps=target_fps,
+            fade_in_duration=fade_in_duration,
+            fade_out_duration=fade_out_duration,
+            audio_source_path=None,
+            window=window,
+            on_frames=on_frames
+        )
+    else:
+        _stream_video_with_overlay(
+            video_input_path,
+            overlay_image_path,
+            overlay,
+            segment_file,
+            target_fps=target_fps,
+            fade_in_duration=fade_in_duration,
+            fade_out_duration=fade_out_duration,
+            audio_source_path=None,
+            backend=backend,
+            workers=workers,
+            compositor=compositor,
+            batch_size=batch_size,
+            window=window,
+            on_frames=on_frames
+        )
+    return segment_file
+
+def _concat_segments(segment_files: list[str], output_video_file: str, audio_source_path: str, temp_dir: str):
+    """
+    Joins encoded segments with the concat demuxer (stream copy) and muxes in the audio.
+
+    Raises:
+        subprocess.CalledProcessError: If an ffmpeg command fails.
+        FileNotFoundError: If ffmpeg executable is not found.
+    """
+    list_file = os.path.join(temp_dir, "segments.txt")
+    with open(list_file, "w") as file:
+        for segment_file in segment_files:
+            file.write(f"file '{os.path.abspath(segment_file)}'\n")
+
+    audio_source_path = _resolve_audio_path(audio_source_path)
+    command = ["ffmpeg", "-f", "concat", "-safe", "0", "-i", list_file]
+    if audio_source_path:
+        command.extend(["-i", audio_source_path, "-map", "0:v:0", "-map", "1:a:0", "-shortest"])
+        command.extend(["-c:v", "copy"] + _audio_codec_args(audio_source_path))
+    else:
+        command.extend(["-c", "copy"])
+    command.extend(["-y", output_video_file])
+
+    _run_ffmpeg(command, "joining segments")
+
+@perf.traced("render")
+def _render_segmented(
+    video_input_path: str,
+    overlay_image_path: str,
+    output_video_file: str,
+    temp_dir_base: str,
+    segments: int,
+    target_fps: int,
+    fade_in_duration: float,
+    fade_out_duration: float,
+    audio_source_path: str,
+    engine: str,
+    backend: str,
+    workers: int,
+    compositor: str,
+    batch_size: int
+):
+    """
+    Splits the timeline into `segments` windows and renders each one end to end (decode, process,
+    encode) on its own worker process, with `workers` (threads) split between them. Only the first
+    segment fades in and only the last one fades out; the segments are then joined without
+    re-encoding and the audio is muxed in. The workers report their frames to one progress bar here.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg or ffprobe fails.
+        FileNotFoundError: If ffmpeg or ffprobe executables are not found.
+    """
+    _, _, src_duration = _probe_video(video_input_path)
+    total_frames = max(1, round(src_duration * _DECODE_FPS))
+    # A fade must fit inside its segment, a boundary in the middle of it would show as a jump. The
+    # fade-out segment must be longer than the fade, `_build_fade_filters` skips it otherwise.
+    fade_in_frames = math.ceil(max(fade_in_duration, 0) * target_fps)
+    fade_out_frames = math.ceil(max(fade_out_duration, 0) * target_fps)
+    start_time = _probe_start_time(video_input_path)
+    windows = _segment_windows(total_frames, segments, start_time)
+    while len(windows) > 1 and (windows[0][1] < fade_in_frames or windows[-1][1] <= fade_out_frames):
+        segments -= 1
+        windows = _segment_windows(total_frames, segments, start_time)
+    segment_dir = os.path.join(temp_dir_base, "segments")
+    os.makedirs(segment_dir, exist_ok=True)
+    segment_files = [os.path.join(segment_dir, f"segment_{i:04d}.mp4") for i in range(len(windows))]
+    segment_workers = max(1, workers // len(windows))
+
+    logger.info(f"Rendering {len(windows)} segments with {segment_workers} {backend} workers each...")
+    progress_queue = _MP_CONTEXT.Queue()
+    executor = ProcessPoolExecutor(
+        max_workers=len(windows), mp_context=_MP_CONTEXT,
+        initializer=_init_segment_worker, initargs=(progress_queue, _log_queue)
+    )
+    with executor, Progress() as progress:
+        task = progress.add_task("Image Processing", total=total_frames)
+        futures = [
+            executor.submit(
+                _render_segment,
+                video_input_path,
+                overlay_image_path,
+                segment_file,
+                window,
+                target_fps,
+                fade_in_duration if i == 0 else 0,
+                fade_out_duration if i == len(windows) - 1 else 0,
+                engine,
+                backend,
+                segment_workers,
+                compositor,
+                batch_size
+            )
+            for i, (segment_file, window) in enumerate(zip(segment_files, windows))
+        ]
+        pending = futures
+        rendered_frames = 0
+        while pending:
+            _, pending = wait(pending, timeout=0.1)
+            if not pending:
+                executor.shutdown() # the workers flush their last counts as they exit
+            try:
+                while True:
+                    frames = progress_queue.get_nowait()
+                    rendered_frames += frames
+                    progress.update(task, advance=frames)
+            except queue.Empty:
+                pass
+        for future in futures:
+            future.result()
+    if rendered_frames != total_frames:
+        logger.warning(f"The segments have {rendered_frames} frames in total, expected {total_frames}.")
+
+    _concat_segments(segment_files, output_video_file, audio_source_path, segment_dir)
+    perf.add_frames(total_frames)
+    logger.info(f"Video '{output_video_file}' created successfully from {len(windows)} segments.")
+
+
 # --- Global Function for Video Processing ---
 
+def _load_overlay(overlay_image_path: str) -> _OverlayLayer:
+    """
+    Opens the overlay image and reduces it to an `_OverlayLayer` (its pixels are loaded up front,
+    so worker threads never race on PIL's lazy loading).
+
+    Raises:
+        FileNotFoundError: If the overlay image is not found.
+    """
+    try:
+        with Image.open(overlay_image_path) as overlay:
+            return _OverlayLayer(overlay)
+    except FileNotFoundError:
+        logger.error(f"Error: Overlay image not found at '{overlay_image_path}'.")
+        raise FileNotFoundError(f"Overlay image not found: {overlay_image_path}")
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while opening the overlay image: {e}")
+        raise
+
+@perf.traced("overlay_video")
+@_render_logging()
 def process_video_with_overlay(
     video_input_path: str,
     overlay_image_path: str,
@@ -229,7 +2293,19 @@ def process_video_with_overlay(
     target_fps: int = 30,
     fade_in_duration: float = 1,
     fade_out_duration: float = 2,
-    audio_source_path: str = None
+    audio_source_path: str = None,
+    engine: str = "frames",
+    backend: str = "thread",
+    workers: int = None,
+    compositor: str = "pil",
+    batch_size: int = 4,
+    background_cache: bool = False,
+    resume: bool = False,
+    max_frames_in_flight: int = None,
+    max_mb_in_flight: float = None,
+    segments: int = None,
+    audio_section: tuple = None,
+    render_cache: bool = True
 ):
     """
     Orchestrates the entire video processing workflow:
@@ -238,6 +2314,15 @@ def process_video_with_overlay(
     3. Combines processed frames into a new video with optional fades and audio.
     4. Cleans up temporary directories.
 
+    With engine="stream" steps 1-3 run concurrently over pipes and nothing is written to disk.
+    With engine="ffmpeg" steps 1-3 are a single ffmpeg filtergraph and no frame enters Python.
+    With background_cache (engine="ffmpeg" only) the resized, B&W and blurred background comes
+    from the on-disk cache and only the overlay and encode run.
+    With segments (stream and ffmpeg engines), the timeline is split into that many parts that
+    are rendered end to end in parallel worker processes and joined without re-encoding.
+    With resume, a manifest in temp_dir_base records the finished stages and frames, a failed
+    run keeps temp_dir_base, and running again with the same inputs only does the remaining work.
+
     Args:
         video_input_path (str): Path to the input video file.
         overlay_image_path (str): Path to the overlay image file.
@@ -247,46 +2332,245 @@ def process_video_with_overlay(
         fade_in_duration (float): Duration of the fade-in effect in seconds.
         fade_out_duration (float): Duration of the fade-out effect in seconds.
         audio_source_path (str): Path to the audio file to use (can be the input video itself).
+        engine (str): "frames" keeps PNG frames in temp_dir_base between the stages,
+            "spool" keeps them in two memory-mapped raw frame files there instead,
+            "stream" pipes raw frames from the decoder through the overlay step into the encoder,
+            "ffmpeg" does everything with native ffmpeg filters (backend/compositor are ignored).
+        backend (str): "thread" processes frames on a thread pool, "process" on a process pool
+            (frames are passed through shared memory, the overlay is loaded once per worker).
+        workers (int): Number of frame processing workers, defaults to the number of CPUs.
+        compositor (str): "pil" runs the grayscale/blur/paste steps through Pillow, "numpy" runs them
+            as integer array math on batches of `batch_size` frames (spool and stream engines only).
+        batch_size (int): Frames per batch for the "numpy" compositor, and per task for the spool engine.
+        background_cache (bool): Reuse (or build) a cached preprocessed copy of the background video.
+            Requires engine="ffmpeg", which overlays it in a single filtergraph.
+        resume (bool): Checkpoint the "frames" and "spool" engines and resume from temp_dir_base.
+        max_frames_in_flight (int): Most frames read but not yet written by the "frames" and "stream"
+            engines (processed in order with backpressure), defaults to twice the workers (one batch per
+            worker with the "numpy" compositor). The "spool" engine keeps its frames in the memory-mapped
+            spool files, there the cap only limits the "numpy" compositors (one batch each).
+        max_mb_in_flight (float): The same cap in megabytes of decoded plus processed frame data, which
+            includes the working buffers of the "numpy" compositor (about 28 bytes per output pixel and frame).
+        segments (int): Number of time segments to render in parallel worker processes ("stream" and
+            "ffmpeg" engines, thread backend), each one with its share of the workers.
+        audio_section (tuple): (start, end) seconds of audio_source_path to use, taken from the
+            audio section cache with the video's fades applied to it too.
+        render_cache (bool): Return a cached copy when the same inputs (by content) were already
+            rendered with the same settings, and cache the result otherwise.
 
     Raises:
         FileNotFoundError: If input video, overlay image, or ffmpeg are not found.
+        ValueError: If the engine, backend or compositor is unknown, or not supported by the engine
+            (or resume is requested for an engine that keeps nothing on disk, or background_cache
+            for an engine other than "ffmpeg").
         Exception: For any other unexpected errors during processing.
     """
+    if engine not in ("frames", "spool", "stream", "ffmpeg"):
+        raise ValueError(f"Unknown engine '{engine}', expected 'frames', 'spool', 'stream' or 'ffmpeg'.")
+    if backend not in ("thread", "process"):
+        raise ValueError(f"Unknown backend '{backend}', expected 'thread' or 'process'.")
+    if compositor not in ("pil", "numpy"):
+        raise ValueError(f"Unknown compositor '{compositor}', expected 'pil' or 'numpy'.")
+    if background_cache and engine != "ffmpeg":
+        raise ValueError("background_cache requires engine='ffmpeg'.")
+    if compositor == "numpy" and engine not in ("spool", "stream"):
+        raise ValueError("The 'numpy' compositor requires engine='spool' or engine='stream'.")
+    if resume and (background_cache or engine not in ("frames", "spool")):
+        raise ValueError("resume requires engine='frames' or engine='spool' without background_cache.")
+    if segments and segments > 1 and (background_cache or engine not in ("stream", "ffmpeg")):
+        raise ValueError("segments requires engine='stream' or engine='ffmpeg' without background_cache.")
+    if segments and segments > 1 and backend == "process":
+        raise ValueError("segments already render in worker processes, use backend='thread' with them.")
+    workers = workers or os.cpu_count() or 1
+    perf.annotate(
+        engine=engine, backend=backend, workers=workers, compositor=compositor,
+        background_cache=background_cache, segments=segments
+    )
+
     start_time = time.perf_counter()
     logger.info(f"Starting video processing for '{video_input_path}'...")
 
-    output_images_dir = os.path.join(temp_dir_base, "decompressed_frames")
-    final_images_dir = os.path.join(temp_dir_base, "processed_frames")
+    if audio_section and _resolve_audio_path(audio_source_path):
+        _, _, src_duration = _probe_video(video_input_path)
+        audio_source_path = _prepare_audio_section(
+            audio_source_path,
+            audio_section,
+            duration=_get_video_duration(max(1, round(src_duration * _DECODE_FPS)), target_fps),
+            fade_in_duration=fade_in_duration,
+            fade_out_duration=fade_out_duration
+        )
+
+    render_key = None
+    if render_cache:
+        audio = audio_source_path if audio_source_path and os.path.exists(audio_source_path) else None
+        render_key = make_key(
+            "overlay_video", file_digest(video_input_path), file_digest(overlay_image_path),
+            file_digest(audio) if audio else None, target_fps, fade_in_duration, fade_out_duration,
+            engine, compositor, background_cache, segments if segments and segments > 1 else None,
+            _DECODE_FPS, _BLUR_RADIUS, _VIDEO_CODEC_ARGS, _AUDIO_CODEC_ARGS
+        )
+        if _restore_render(render_key, output_video_file):
+            perf.annotate(render_cache="hit")
+            return output_video_file
+
+    if background_cache:
+        overlay = _load_overlay(overlay_image_path)
+        _render_with_filtergraph(
+            _prepare_background(video_input_path, overlay.size),
+            overlay_image_path,
+            overlay,
+            output_video_file,
+            target_fps=target_fps,
+            fade_in_duration=fade_in_duration,
+            fade_out_duration=fade_out_duration,
+            audio_source_path=audio_source_path,
+            preprocessed=True
+        )
+        end_time = time.perf_counter()
+        logger.info(f"Total time taken: {end_time - start_time:.2f}s")
+        return _store_render(render_key, output_video_file)
+
+    if segments and segments > 1:
+        try:
+            _render_segmented(
+                video_input_path,
+                overlay_image_path,
+                output_video_file,
+                temp_dir_base,
+                segments,
+                target_fps=target_fps,
+                fade_in_duration=fade_in_duration,
+                fade_out_duration=fade_out_duration,
+                audio_source_path=audio_source_path,
+                engine=engine,
+                backend=backend,
+                workers=workers,
+                compositor=compositor,
+                batch_size=batch_size
+            )
+        finally:
+            if os.path.exists(temp_dir_base):
+                logger.info(f"Cleaning up temporary directory: {temp_dir_base}")
+                shutil.rmtree(temp_dir_base)
+        end_time = time.perf_counter()
+        logger.info(f"Total time taken: {end_time - start_time:.2f}s")
+        return _store_render(render_key, output_video_file)
+
+    if engine == "ffmpeg":
+        overlay = _load_overlay(overlay_image_path)
+        _render_with_filtergraph(
+            video_input_path,
+            overlay_image_path,
+            overlay,
+            output_video_file,
+            target_fps=target_fps,
+            fade_in_duration=fade_in_duration,
+            fade_out_duration=fade_out_duration,
+            audio_source_path=audio_source_path
+        )
+        end_time = time.perf_counter()
+        logger.info(f"Total time taken: {end_time - start_time:.2f}s")
+        return _store_render(render_key, output_video_file)
+
+    checkpoint = _Checkpoint(temp_dir_base)
+    if resume:
+        checkpoint = _Checkpoint.open(
+            temp_dir_base,
+            make_key(
+                "checkpoint", engine, file_digest(video_input_path), file_digest(overlay_image_path),
+                _DECODE_FPS, _BLUR_RADIUS
+            )
+        )
+
+    if engine == "spool":
+        try:
+            _render_with_spool(
+                video_input_path,
+                overlay_image_path,
+                _load_overlay(overlay_image_path),
+                output_video_file,
+                temp_dir_base,
+                target_fps=target_fps,
+                fade_in_duration=fade_in_duration,
+                fade_out_duration=fade_out_duration,
+                audio_source_path=audio_source_path,
+                backend=backend,
+                workers=workers,
+                compositor=compositor,
+                batch_size=batch_size,
+                checkpoint=checkpoint,
+                max_frames_in_flight=max_frames_in_flight,
+                max_mb_in_flight=max_mb_in_flight
+            )
+        except Exception as e:
+            logger.error(f"Failed to render video with the spool engine: {e}")
+            _remove_temp_dir(temp_dir_base, resume)
+            raise
 
-    # Step 1: Decompress the video into individual image frames
-    try:
-        _decompress_video(video_input_path, output_images_dir)
-    except (FileNotFoundError, sp.CalledProcessError) as e:
-        logger.error(f"Failed to decompress video: {e}")
-        # Clean up partial temp directory if any
         if os.path.exists(temp_dir_base):
+            logger.info(f"Cleaning up temporary directory: {temp_dir_base}")
             shutil.rmtree(temp_dir_base)
-        raise
+        end_time = time.perf_counter()
+        logger.info(f"Total time taken: {end_time - start_time:.2f}s")
+        return _store_render(render_key, output_video_file)
+
+    if engine == "stream":
+        overlay = _load_overlay(overlay_image_path)
+        _stream_video_with_overlay(
+            video_input_path,
+            overlay_image_path,
+            overlay,
+            output_video_file,
+            target_fps=target_fps,
+            fade_in_duration=fade_in_duration,
+            fade_out_duration=fade_out_duration,
+            audio_source_path=audio_source_path,
+            backend=backend,
+            workers=workers,
+            compositor=compositor,
+            batch_size=batch_size,
+            max_frames_in_flight=max_frames_in_flight,
+            max_mb_in_flight=max_mb_in_flight
+        )
+        end_time = time.perf_counter()
+        logger.info(f"Total time taken: {end_time - start_time:.2f}s")
+        return _store_render(render_key, output_video_file)
+
+    output_images_dir = os.path.join(temp_dir_base, "decompressed_frames")
+    final_images_dir = os.path.join(temp_dir_base, "processed_frames")
+
+    # Step 1: Decompress the video into individual image frames (unless a resumed run already did)
+    if checkpoint.decoded and os.path.isdir(output_images_dir) \
+            and len(os.listdir(output_images_dir)) == checkpoint.frame_count:
+        logger.info(f"Reusing {checkpoint.frame_count} decoded frames from '{output_images_dir}'.")
+    else:
+        try:
+            if os.path.exists(output_images_dir):
+                shutil.rmtree(output_images_dir) # Partially decoded by an interrupted run
+            with perf.span("decode") as stage:
+                _decompress_video(video_input_path, output_images_dir)
+                stage.frames = len(os.listdir(output_images_dir))
+        except (FileNotFoundError, sp.CalledProcessError) as e:
+            logger.error(f"Failed to decompress video: {e}")
+            # Clean up partial temp directory if any
+            _remove_temp_dir(temp_dir_base, resume)
+            raise
+        checkpoint.done.clear()
+        checkpoint.mark_decoded(len(os.listdir(output_images_dir)))
 
     # Step 2: Load the overlay image
     try:
-        overlay: Image.Image = Image.open(overlay_image_path)
-    except FileNotFoundError:
-        logger.error(f"Error: Overlay image not found at '{overlay_image_path}'.")
-        if os.path.exists(temp_dir_base):
-            shutil.rmtree(temp_dir_base)
-        raise FileNotFoundError(f"Overlay image not found: {overlay_image_path}")
-    except Exception as e:
-        logger.error(f"An unexpected error occurred while opening the overlay image: {e}")
-        if os.path.exists(temp_dir_base):
-            shutil.rmtree(temp_dir_base)
+        overlay = _load_overlay(overlay_image_path)
+    except Exception:
+        _remove_temp_dir(temp_dir_base, resume)
         raise
 
     os.makedirs(final_images_dir, exist_ok=True)
-    logger.info(f"Processing frames and applying overlay using {os.cpu_count()} threads. Outputting to '{final_images_dir}'...")
+    logger.info(f"Processing frames and applying overlay using {workers} {backend} workers. Outputting to '{final_images_dir}'...")
 
-    # Step 3: Process each decompressed image frame using ThreadPoolExecutor
-    with Progress() as progress:
+    # Step 3: Process each decompressed image frame using a thread or process pool,
+    # with a bounded number of frames in flight
+    with perf.span("frame_processing") as stage, Progress() as progress:
         all_files = os.listdir(output_images_dir)
         image_files = sorted(
             [f for f in all_files if os.path.splitext(f)[1].lower() in [".jpg", ".png", ".jpeg"]],
@@ -295,22 +2579,91 @@ def process_video_with_overlay(
 
         if not image_files:
             logger.error(f"No image files found in '{output_images_dir}'. Exiting.")
-            if os.path.exists(temp_dir_base):
-                shutil.rmtree(temp_dir_base)
+            _remove_temp_dir(temp_dir_base)
             raise ValueError(f"No image files found in {output_images_dir}")
 
-        task = progress.add_task("Image Processing", total=len(image_files))
-        futures = []
+        # Every frame has the same size, so the resize/rotate/crop decisions are made once.
+        with Image.open(os.path.join(output_images_dir, image_files[0])) as first_frame:
+            plan = _plan_geometry(first_frame.size, overlay.size)
+            frame_bytes = (first_frame.width * first_frame.height + overlay.size[0] * overlay.size[1]) * 3
+        max_in_flight = _frames_in_flight(frame_bytes, workers, max_frames_in_flight, max_mb_in_flight)
+
+        # Frames a resumed run already processed (and that survived intact) are not submitted again.
+        done = {
+            idx for idx in checkpoint.done
+            if _is_complete_png(os.path.join(final_images_dir, f"final_image_{idx:09d}.png"))
+        }
+        checkpoint.done &= done
+        task = progress.add_task("Image Processing", total=len(image_files), completed=len(done))
+        final_path = lambda idx: os.path.join(final_images_dir, f"final_image_{idx:09d}.png")
+        holes = [] # Failed frames with no earlier frame to repeat yet
+
+        # Consecutive identical decoded frames (held frames, the -r 30 padding of low fps sources)
+        # form runs that are processed once; the rest of a run copies the first frame's result.
+        runs = _frame_runs(image_files, key=lambda file: _png_digest(os.path.join(output_images_dir, file)))
+        runs, jobs = itertools.tee(run for run in runs if not done.issuperset(range(run[0], run[0] + run[2])))
+        path_jobs, index_jobs = itertools.tee(run for run in jobs if run[0] not in done)
+        paths = (os.path.join(output_images_dir, file) for _, file, _ in path_jobs)
+        indices = (idx for idx, _, _ in index_jobs)
+        unique_count = 0
+
+        if backend == "process":
+            # Workers only receive file paths; each one loads the overlay once in its initializer.
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=_MP_CONTEXT, initializer=_init_frame_worker,
+                initargs=(overlay_image_path, None, None, "pil", _log_queue)
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
 
-        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-            for idx, file in enumerate(image_files, start=1):
-                fp = os.path.join(output_images_dir, file)
-                futures.append(executor.submit(_process_single_image, fp, idx, overlay, final_images_dir))
+        if backend == "process":
+            results = _ordered_map(
+                executor, _process_single_image_in_worker,
+                paths, indices, itertools.repeat(final_images_dir), itertools.repeat(plan),
+                limit=max_in_flight
+            )
+        else:
+            results = _ordered_map(
+                executor, _process_single_image,
+                paths, indices, itertools.repeat(overlay), itertools.repeat(final_images_dir), itertools.repeat(plan),
+                limit=max_in_flight
+            )
 
-            for future in as_completed(futures):
-                if not future.result(): # Check if processing failed for any image
-                    logger.warning("One or more images failed to process. Continuing with successful ones.")
-                progress.update(task, advance=1)
+        with executor:
+            # Results arrive in frame order, so every earlier frame is final when a frame fails
+            # and the hole is filled with a copy of its predecessor (ffmpeg stops at a gap).
+            for first, _, count in runs:
+                if first not in done:
+                    unique_count += 1
+                    if next(results):
+                        checkpoint.record([first])
+                        for hole in holes:
+                            shutil.copyfile(final_path(first), hole)
+                        holes.clear()
+                    else: # Check if processing failed for any image
+                        logger.warning(
+                            "One or more images failed to process. Repeating the previous frame.",
+                            extra={"sample": "frame repeated"}
+                        )
+                        if os.path.exists(final_path(first - 1)):
+                            shutil.copyfile(final_path(first - 1), final_path(first))
+                        else:
+                            holes.append(final_path(first))
+                    progress.update(task, advance=1)
+
+                for idx in range(first + 1, first + count):
+                    if idx in done:
+                        continue
+                    if os.path.exists(final_path(first)):
+                        shutil.copyfile(final_path(first), final_path(idx))
+                        if first in checkpoint.done:
+                            checkpoint.record([idx])
+                    else:
+                        holes.append(final_path(idx))
+                    progress.update(task, advance=1)
+        checkpoint.save()
+        stage.frames = len(image_files) - len(done)
+        logger.info(f"Processed {unique_count} unique frames out of {stage.frames}.")
 
     # Step 4: Combine the processed images into the final video
     try:
@@ -326,8 +2679,7 @@ def process_video_with_overlay(
     except (FileNotFoundError, sp.CalledProcessError) as e:
         logger.error(f"Failed to combine images into video: {e}")
         # Clean up before re-raising
-        if os.path.exists(temp_dir_base):
-            shutil.rmtree(temp_dir_base)
+        _remove_temp_dir(temp_dir_base, resume)
         raise
 
     # Step 5: Clean up temporary directories
@@ -339,7 +2691,7 @@ def process_video_with_overlay(
     logger.info(f"Script execution finished. Look for '{output_video_file}' in the current directory.")
     logger.info(f"Total time taken: {end_time - start_time:.2f}s")
 
-    return output_video_file
+    return _store_render(render_key, output_video_file)
 
 
 # This is my stupid code
@@ -355,24 +2707,37 @@ class RenderImageAsVideo:
         self.fadein = kwargs.get("fadein") or 2.0
         self.fadeout = self.fadein
         self.vfx = [mp.vfx.FadeIn(self.fadein), mp.vfx.FadeOut(self.fadeout)]
-        self.afx = [mp.afx.AudioFadeIn(self.fadein), mp.afx.AudioFadeOut(self.fadeout)]
         self.audio: mp.CompositeAudioClip = None
+        self.audio_section: str = None # Cached AAC section set by set_audio_section (or set_audio)
+        # Encode stills with one looped-image ffmpeg pass; False renders every frame through moviepy.
+        self.fast_path: bool = kwargs.get("fast_path", True)
+        # Copy finished videos from the render cache when the image, audio and settings were rendered before.
+        self.render_cache: bool = kwargs.get("render_cache", True)
 
         os.makedirs(self.output_path, exist_ok=True)
 
+    def set_audio_section(
+        self, audio_path: str, audio_cut_time: tuple[int, int]
+    ) -> str:
+        # Trimmed, faded and encoded once per section, then stream copied into every render.
+        self.audio_section = _prepare_audio_section(
+            audio_path, tuple(audio_cut_time), self.duration, self.fadein, self.fadeout
+        )
+        return self.audio_section
+
     def set_audio(
         self, audio_path: str, audio_cut_time: tuple[int, int]
     ) -> mp.CompositeAudioClip:
-        self.audio = (
-            mp.CompositeAudioClip(
-                [mp.AudioFileClip(audio_path).subclipped(*audio_cut_time)]
-            )
-            .with_effects(self.afx)
-            .with_duration(self.duration)
-        )
+        # The cached section (already trimmed and faded) as a clip; renders use the file itself.
+        self.audio = mp.CompositeAudioClip(
+            [mp.AudioFileClip(self.set_audio_section(audio_path, audio_cut_time))]
+        ).with_duration(self.duration)
         return self.audio
 
-    def save_clip(self, clip: mp.CompositeVideoClip, filename: str, codec: str = "h264", preset: str = "fast"):
+    def clean_path(self, filename: str) -> str:
+        """
+        Creates the output directory and returns `filename` with a sanitized name and extension.
+        """
         directory, file_name = os.path.split(filename)
         name, ext = os.path.splitext(file_name)
 
@@ -384,10 +2749,29 @@ class RenderImageAsVideo:
 
         # Sanitize the filename (remove spaces/symbols)
         name = re.sub(r"[\W]+", "_", name)
-        cleaned_path = os.path.join(directory, name + ext)
+        return os.path.join(directory, name + ext)
+
+    def save_clip(
+        self,
+        clip: mp.CompositeVideoClip,
+        filename: str,
+        codec: str = "h264",
+        preset: str = "fast",
+        audio_path: str = None
+    ):
+        cleaned_path = self.clean_path(filename)
 
         # Save video
-        clip.write_videofile(filename=cleaned_path, codec=codec, preset=preset)
+        if audio_path:
+            name, ext = os.path.splitext(cleaned_path)
+            video_only_path = name + ".video" + ext
+            clip.write_videofile(filename=video_only_path, codec=codec, preset=preset, audio=False)
+            try:
+                _mux_audio(video_only_path, audio_path, cleaned_path)
+            finally:
+                os.remove(video_only_path)
+        else:
+            clip.write_videofile(filename=cleaned_path, codec=codec, preset=preset)
 
         return cleaned_path if os.path.exists(cleaned_path) else None
 
@@ -400,7 +2784,7 @@ class RenderImageAsVideo:
 
     def convert_image(self, image_path: str, output_name=None):
 
-        if not self.audio:
+        if not self.audio_section:
             raise Exception("Audio isn't set, consider doing .set_audio() first")
 
         if output_name:
@@ -409,11 +2793,40 @@ class RenderImageAsVideo:
         if not os.path.exists(image_path) or not os.path.isfile(image_path):
             raise FileExistsError("Image File Doesn't Exist")
 
-        image = mp.ImageClip(image_path, duration=self.duration).with_effects(self.vfx)
-        clip = self.create_comp(image, fps=30)
-        clip.audio = self.audio
-        fp = self.save_clip(clip, os.path.join(self.output_path, self.output_name))
+        filename = os.path.join(self.output_path, self.output_name)
+        render_key = None
+        if self.render_cache:
+            # The fast path and the moviepy fallback render the same video, so the path is not part of the key.
+            render_key = make_key(
+                "still_video", file_digest(image_path), file_digest(self.audio_section), self.duration,
+                self.fadein, self.fadeout, _STILL_FPS, _STILL_CODEC, _STILL_PRESET, _STILL_TUNE
+            )
+            cached_path = self.clean_path(filename)
+            if _restore_render(render_key, cached_path):
+                return cached_path
+
+        fp = None
+        with perf.span("encode", frames=round(self.duration * _STILL_FPS)) as stage:
+            if self.fast_path:
+                fp = self.clean_path(filename)
+                try:
+                    _render_still_image(
+                        image_path, fp, self.duration, fps=_STILL_FPS,
+                        fade_in_duration=self.fadein, fade_out_duration=self.fadeout,
+                        audio_path=self.audio_section
+                    )
+                except (sp.CalledProcessError, FileNotFoundError):
+                    logger.warning("Still image fast path failed, rendering through moviepy instead.")
+                    fp = None
+            stage.attrs["fast_path"] = bool(fp)
+
+            if not fp:
+                image = mp.ImageClip(image_path, duration=self.duration).with_effects(self.vfx)
+                clip = self.create_comp(image, fps=_STILL_FPS)
+                fp = self.save_clip(
+                    clip, filename, codec=_STILL_CODEC, preset=_STILL_PRESET, audio_path=self.audio_section
+                )
         if not fp:
             raise Exception("Unable to save Video")
 
-        return fp 
+        return _store_render(render_key, fp)